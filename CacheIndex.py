@@ -0,0 +1,119 @@
+"""
+Index of the synthesized clips in the audio cache, kept in SQLite and loaded into memory once at startup.
+
+Clips are keyed by language, voice, alpha, and the SHA-1 of the normalized text, the same content the cache
+file names are made from. Membership is answered from memory, without a stat call per lookup. The index also
+records each clip's length in LESSON_HZ frames and its loudness before normalization.
+
+The cache directories are listed when the index is loaded, so files added or deleted outside of a run are
+picked up. Files found on disk without a row are keyed the first time a lookup asks for them.
+"""
+from __future__ import annotations
+
+import dataclasses
+import os
+import sqlite3
+import threading
+
+ClipKey = tuple[str, str, str, str]  # lang, voice, alpha, SHA-1 of the normalized text
+
+
+@dataclasses.dataclass(slots=True)
+class ClipInfo:
+    file: str = ""
+    key: ClipKey | None = None
+    size: int = 0
+    mtime_ns: int = 0
+    frames: int = 0  # Normalized LESSON_HZ frames. Zero until the clip is first decoded.
+    dbfs: float | None = None  # Loudness of the clip as synthesized.
+
+
+@dataclasses.dataclass(slots=True)
+class CacheIndex:
+    db_file: str = os.path.join("cache", "index.sqlite")
+    clips: dict[str, ClipInfo] = dataclasses.field(default_factory=dict)  # By file.
+    files: dict[ClipKey, str] = dataclasses.field(default_factory=dict)
+    lock: threading.RLock = dataclasses.field(default_factory=threading.RLock, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.clips)
+
+    def load(self, cache_dirs: list[str]) -> None:
+        """Loads the saved rows, keeping only those whose file is still in one of the cache directories."""
+        rows: dict[str, ClipInfo] = dict()
+        if os.path.exists(self.db_file):
+            with sqlite3.connect(self.db_file) as db:
+                for lang, voice, alpha, sha1, file, size, mtime_ns, frames, dbfs in db.execute(
+                        "SELECT lang, voice, alpha, sha1, file, size, mtime_ns, frames, dbfs FROM clips"):
+                    rows[file] = ClipInfo(file, (lang, voice, alpha, sha1), size, mtime_ns, frames, dbfs)
+            db.close()
+        with self.lock:
+            self.clips.clear()
+            self.files.clear()
+            for cache_dir in cache_dirs:
+                if not os.path.isdir(cache_dir):
+                    continue
+                with os.scandir(cache_dir) as entries:
+                    for entry in entries:
+                        if not entry.name.endswith(".mp3"):
+                            continue
+                        file: str = os.path.join(cache_dir, entry.name)
+                        stat: os.stat_result = entry.stat()
+                        info: ClipInfo | None = rows.get(file)
+                        if info is None:
+                            info = ClipInfo(file)
+                        if info.size != stat.st_size or info.mtime_ns != stat.st_mtime_ns:
+                            info.size, info.mtime_ns, info.frames, info.dbfs = stat.st_size, stat.st_mtime_ns, 0, None
+                        self.clips[file] = info
+                        if info.key:
+                            self.files[info.key] = file
+
+    def save(self) -> None:
+        """Rewrites the table with every keyed clip."""
+        os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+        with self.lock:
+            rows: list[tuple] = [(*info.key, info.file, info.size, info.mtime_ns, info.frames, info.dbfs)
+                                 for info in self.clips.values() if info.key]
+        with sqlite3.connect(self.db_file) as db:
+            db.execute("CREATE TABLE IF NOT EXISTS clips (lang TEXT, voice TEXT, alpha TEXT, sha1 TEXT,"
+                       " file TEXT, size INTEGER, mtime_ns INTEGER, frames INTEGER, dbfs REAL,"
+                       " PRIMARY KEY (lang, voice, alpha, sha1))")
+            db.execute("DELETE FROM clips")
+            db.executemany("INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        db.close()
+
+    def has(self, key: ClipKey, file: str) -> bool:
+        with self.lock:
+            if key in self.files:
+                return True
+            info: ClipInfo | None = self.clips.get(file)
+            if info is None:
+                return False
+            info.key = key
+            self.files[key] = file
+            return True
+
+    def add(self, file: str, key: ClipKey | None = None) -> ClipInfo:
+        """Records a file newly written into the cache."""
+        stat: os.stat_result = os.stat(file)
+        with self.lock:
+            info: ClipInfo = ClipInfo(file, key, stat.st_size, stat.st_mtime_ns)
+            old: ClipInfo | None = self.clips.get(file)
+            if old and old.key and not key:
+                info.key = old.key
+            self.clips[file] = info
+            if info.key:
+                self.files[info.key] = file
+            return info
+
+    def get(self, file: str) -> ClipInfo | None:
+        return self.clips.get(file)
+
+    def set_audio(self, file: str, frames: int, dbfs: float | None = None) -> None:
+        with self.lock:
+            info: ClipInfo | None = self.clips.get(file)
+            if info is None:
+                info = self.add(file)
+            info.frames = frames
+            if dbfs is not None:
+                info.dbfs = dbfs
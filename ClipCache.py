@@ -0,0 +1,64 @@
+"""
+Bounded LRU cache of decoded and normalized audio clips, keyed by the cache file name of the clip.
+
+Eviction is by total PCM size in bytes rather than by entry count, as clip lengths vary from a single
+word to whole paragraphs of instructor prompts.
+"""
+from __future__ import annotations
+
+import dataclasses
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
+from pydub import AudioSegment
+
+
+@dataclasses.dataclass(slots=True)
+class ClipCache:
+    max_bytes: int = 1024 * 1024 * 1024
+    size: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    clips: OrderedDict[str, AudioSegment] = dataclasses.field(default_factory=OrderedDict)
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock, repr=False)
+
+    def __str__(self) -> str:
+        lookups: int = self.hits + self.misses
+        hit_rate: float = 100 * self.hits / lookups if lookups else 0.0
+        return (f"{len(self.clips):,} clips, {self.size / 1024 / 1024:,.1f} MiB."
+                f" Hits: {self.hits:,}. Misses: {self.misses:,} ({hit_rate:.1f}% hit rate)."
+                f" Evictions: {self.evictions:,}.")
+
+    def get(self, key: str) -> AudioSegment | None:
+        with self.lock:
+            clip: AudioSegment | None = self.clips.get(key)
+            if clip is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.clips.move_to_end(key)
+            return clip
+
+    def put(self, key: str, clip: AudioSegment) -> None:
+        clip_size: int = len(clip.raw_data)
+        if clip_size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.clips:
+                self.size -= len(self.clips.pop(key).raw_data)
+            self.clips[key] = clip
+            self.size += clip_size
+            while self.size > self.max_bytes:
+                _, evicted = self.clips.popitem(last=False)
+                self.size -= len(evicted.raw_data)
+                self.evictions += 1
+
+    def load(self, key: str, loader: Callable[[], AudioSegment]) -> AudioSegment:
+        """Returns the cached clip, calling loader to decode it on a miss."""
+        clip: AudioSegment | None = self.get(key)
+        if clip is None:
+            clip = loader()
+            self.put(key, clip)
+        return clip
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Versioned deck file format, replacing jsonpickle for saved decks.
+
+The file is a single JSON object with one card per line:
+
+    {"format": "audio-lessons-deck", "version": 1, "columns": [...], "file_columns": [...], "cards": [
+    [card columns...],
+    [card columns...]
+    ]}
+
+Each card is an array of values in the order named by "columns". Challenge and answer files are arrays of
+arrays in the order named by "file_columns". Columns missing from a file get their defaults, and unknown
+columns are ignored, so fields can be added to the dataclasses without a version change.
+
+Decks are read one line at a time, and jsonpickle decks are still read, so existing review decks work as is.
+Run this module to convert jsonpickle decks to the new format.
+"""
+import argparse
+import dataclasses
+import pathlib
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import TextIO
+
+import jsonpickle
+import simplejson
+
+from LeitnerAudioDeck import AudioCard
+from LeitnerAudioDeck import AudioCardStats
+from LeitnerAudioDeck import AudioData
+from LeitnerAudioDeck import AudioDataFile
+from LeitnerAudioDeck import LeitnerAudioDeck
+
+DECK_FORMAT: str = "audio-lessons-deck"
+DECK_VERSION: int = 1
+
+FILE_LISTS: tuple[str, ...] = ("answer_files", "challenge_files")
+DATA_COLUMNS: list[str] = [f.name for f in dataclasses.fields(AudioData)]
+STATS_COLUMNS: list[str] = [f.name for f in dataclasses.fields(AudioCardStats)]
+FILE_COLUMNS: list[str] = [f.name for f in dataclasses.fields(AudioDataFile)]
+COLUMNS: list[str] = [f"data.{name}" for name in DATA_COLUMNS] + [f"stats.{name}" for name in STATS_COLUMNS]
+
+
+def save_deck(cards: Iterable[AudioCard], destination: pathlib.Path, metadata: dict | None = None) -> None:
+    """Saves the cards. Metadata, such as what the deck was made from, is kept in the header line."""
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file: pathlib.Path = destination.with_name(destination.name + ".tmp")
+    with open(tmp_file, "w") as w:
+        header: dict = {"format": DECK_FORMAT, "version": DECK_VERSION, "columns": COLUMNS,
+                        "file_columns": FILE_COLUMNS}
+        if metadata:
+            header["metadata"] = metadata
+        w.write(dumps(header)[:-1] + ', "cards": [')
+        separator: str = "\n"
+        for card in cards:
+            w.write(separator)
+            w.write(dumps(card_row(card)))
+            separator = ",\n"
+        w.write("\n]}\n")
+    tmp_file.replace(destination)
+
+
+def dumps(value) -> str:
+    return simplejson.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def card_row(card: AudioCard) -> list:
+    row: list = list()
+    data: AudioData = card.data
+    for name in DATA_COLUMNS:
+        value = getattr(data, name)
+        if name in FILE_LISTS:
+            value = [[getattr(data_file, column) for column in FILE_COLUMNS] for data_file in value]
+        row.append(value)
+    stats: AudioCardStats = card.card_stats
+    for name in STATS_COLUMNS:
+        row.append(getattr(stats, name))
+    return row
+
+
+def load_deck(source: pathlib.Path) -> LeitnerAudioDeck:
+    """Loads a deck in either the deck file format or as saved by jsonpickle."""
+    with open(source, "r") as r:
+        if not is_deck_file(r):
+            return load_jsonpickle_deck(r)
+        deck: LeitnerAudioDeck = LeitnerAudioDeck()
+        for card in read_cards(r):
+            deck.append(card)
+        return deck
+
+
+def is_deck_file(r: TextIO) -> bool:
+    position: int = r.tell()
+    first_line: str = r.readline()
+    r.seek(position)
+    return first_line.startswith("{") and f'"format":"{DECK_FORMAT}"' in first_line.replace(" ", "")
+
+
+def read_metadata(source: pathlib.Path) -> dict | None:
+    """The metadata saved with a deck file, without reading its cards. None if it is not a deck file."""
+    with open(source, "r") as r:
+        if not is_deck_file(r):
+            return None
+        return simplejson.loads(r.readline().rstrip() + "]}").get("metadata", dict())
+
+
+def iter_cards(source: pathlib.Path) -> Iterator[AudioCard]:
+    """Yields the cards of a deck file one at a time."""
+    with open(source, "r") as r:
+        yield from read_cards(r)
+
+
+def read_cards(r: TextIO) -> Iterator[AudioCard]:
+    first_line: str = r.readline().rstrip()
+    header: dict = simplejson.loads(first_line + "]}")
+    if header.get("format") != DECK_FORMAT:
+        raise ValueError(f"Not a deck file: {r.name}")
+    if header.get("version", 0) > DECK_VERSION:
+        raise ValueError(f"Deck file version {header['version']} is newer than {DECK_VERSION}: {r.name}")
+    columns: list[str] = header["columns"]
+    file_columns: list[str] = [column for column in header["file_columns"] if column in FILE_COLUMNS]
+    file_ixs: list[int] = [header["file_columns"].index(column) for column in file_columns]
+    setters: list[tuple[int, str, str]] = list()
+    for ix, column in enumerate(columns):
+        target, _, name = column.partition(".")
+        if (target == "data" and name in DATA_COLUMNS) or (target == "stats" and name in STATS_COLUMNS):
+            setters.append((ix, target, name))
+    for line in r:
+        line = line.rstrip().removesuffix(",")
+        if not line or line.startswith("]"):
+            continue
+        row: list = simplejson.loads(line)
+        card: AudioCard = AudioCard()
+        for ix, target, name in setters:
+            value = row[ix]
+            if target == "stats":
+                setattr(card.card_stats, name, value)
+                continue
+            if name in FILE_LISTS:
+                value = [AudioDataFile(**{column: item[file_ix] for column, file_ix in zip(file_columns, file_ixs)})
+                         for item in value]
+            setattr(card.data, name, value)
+        yield card
+
+
+def load_jsonpickle_deck(r: TextIO) -> LeitnerAudioDeck:
+    jsonpickle.load_backend('simplejson', 'dumps', 'loads', ValueError)
+    jsonpickle.set_preferred_backend('simplejson')
+    return jsonpickle.loads(r.read())
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Convert jsonpickle decks to deck files.")
+    parser.add_argument("source", type=pathlib.Path, nargs="+")
+    parser.add_argument("--suffix", type=str, default="", help="""
+    Added to the converted file names. Without it, each deck is converted in place.
+    """)
+    args: argparse.Namespace = parser.parse_args()
+    for source in args.source:
+        deck: LeitnerAudioDeck = load_deck(source)
+        destination: pathlib.Path = source.with_name(source.stem + args.suffix + source.suffix)
+        save_deck(deck.cards, destination)
+        print(f"{source} => {destination}: {len(deck):,} cards.")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ from typing import overload
 
 from collections.abc import MutableSequence
 
+import heapq
+
 import random
 
 from dataclasses import dataclass
@@ -17,6 +19,9 @@ from dataclasses import field
 
 rand: random.Random = random.Random(1234)
 
+# When set, every move between decks checks that each card's my_deck is the one deck holding it. For tests.
+check_invariants: bool = False
+
 
 @dataclass(slots=True)
 class AudioDataFile:
@@ -120,24 +125,21 @@ class AudioCard:
     card_stats: AudioCardStats = field(default_factory=AudioCardStats)
 
     def __eq__(self, other: AudioCard) -> bool:
-        if self.card_stats.show_again_delay != other.card_stats.show_again_delay:
-            return False
-        return self.data.card_id == other.data.card_id
+        # By identity. Cards from a review deck can have the same card id and delay as main deck cards.
+        return self is other
 
     def __lt__(self, other):
         return self.card_stats.show_again_delay < other.card_stats.show_again_delay
 
     def __hash__(self) -> int:
-        return hash(repr(self))
+        return id(self)
 
     def next_session_threshold(self, max_shows: int) -> int:
         leitner_box: int = self.card_stats.leitner_box
         return max(max_shows - leitner_box, 1)
 
     def is_in_deck(self) -> bool:
-        if self.my_deck and self in self.my_deck.cards:
-            return True
-        return False
+        return self.my_deck is not None
 
     def reset_stats(self) -> None:
         self.card_stats.correct = True
@@ -150,8 +152,26 @@ class AudioCard:
 
 @dataclass(slots=True)
 class LeitnerAudioDeck(MutableSequence):
+    """
+    Cards in deck order. Each card's slot is indexed by identity, so a card moves into or out of the deck in O(1)
+    at any position. A removed card leaves an empty slot that is skipped, and the slots are compacted once the
+    empty ones outnumber the cards.
+    """
+
+    _slots: list[AudioCard | None] = field(default_factory=list)
+    _positions: dict[int, int] = field(default_factory=dict)  # id(card) => slot
+    _head: int = 0  # First slot holding a card.
 
-    cards: list[AudioCard] = field(default_factory=list)
+    @property
+    def cards(self) -> list[AudioCard]:
+        """The cards in deck order. Assigning a list replaces them as they are, as when loaded with jsonpickle."""
+        return [card for card in self._slots[self._head:] if card is not None]
+
+    @cards.setter
+    def cards(self, cards: list[AudioCard]) -> None:
+        self._slots = list(cards)
+        self._positions = {id(card): ix for ix, card in enumerate(self._slots)}
+        self._head = 0
 
     def update_time(self, delta_secs: float) -> None:
         for card in self.cards:
@@ -160,11 +180,26 @@ class LeitnerAudioDeck(MutableSequence):
             card.card_stats.show_again_delay = max(show_again_delay, 0.0)
 
     def sort_by_show_again(self) -> None:
-        rand.shuffle(self.cards)
-        self.cards.sort(key=lambda card: card.card_stats.show_again_delay)
+        cards: list[AudioCard] = self.cards
+        rand.shuffle(cards)
+        cards.sort(key=lambda card: card.card_stats.show_again_delay)
+        self.cards = cards
+
+    def sort(self, key) -> None:
+        cards: list[AudioCard] = self.cards
+        cards.sort(key=key)
+        self.cards = cards
 
     def insert(self, index: int, value: AudioCard) -> None:
-        self.cards.insert(index, value)
+        if value.my_deck:
+            value.my_deck.remove(value)
+        if index >= len(self):
+            self._append(value)
+        else:
+            cards: list[AudioCard] = self.cards
+            cards.insert(index, value)
+            self.cards = cards
+        value.my_deck = self
 
     @overload
     @abstractmethod
@@ -175,6 +210,8 @@ class LeitnerAudioDeck(MutableSequence):
     def __getitem__(self, s: slice) -> MutableSequence[AudioCard]: ...
 
     def __getitem__(self, i: int) -> AudioCard:
+        if i == 0 and self._positions:
+            return self._slots[self._head]
         return self.cards[i]
 
     @overload
@@ -185,8 +222,16 @@ class LeitnerAudioDeck(MutableSequence):
     @abstractmethod
     def __setitem__(self, s: slice, o: Iterable[AudioCard]) -> None: ...
 
-    def __setitem__(self, i: int, o: AudioCard) -> None:
-        self.cards[i] = o
+    def __setitem__(self, i: int | slice, o: AudioCard) -> None:
+        if isinstance(i, slice):
+            raise TypeError("Deck cards are replaced one at a time so each card's deck is kept in step.")
+        if o.my_deck:
+            o.my_deck.remove(o)
+        cards: list[AudioCard] = self.cards
+        cards[i].my_deck = None
+        cards[i] = o
+        o.my_deck = self
+        self.cards = cards
 
     @overload
     @abstractmethod
@@ -196,33 +241,221 @@ class LeitnerAudioDeck(MutableSequence):
     @abstractmethod
     def __delitem__(self, i: slice) -> None: ...
 
-    def __delitem__(self, i: int) -> None:
-        del self.cards[i]
+    def __delitem__(self, i: int | slice) -> None:
+        cards: list[AudioCard] = self.cards
+        for card in cards[i] if isinstance(i, slice) else [cards[i]]:
+            card.my_deck = None
+        del cards[i]
+        self.cards = cards
 
     def __len__(self) -> int:
-        return len(self.cards)
+        return len(self._positions)
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __contains__(self, value: AudioCard) -> bool:
+        return value.my_deck is self
+
+    def _append(self, value: AudioCard) -> None:
+        self._positions[id(value)] = len(self._slots)
+        self._slots.append(value)
 
     def append(self, value: AudioCard) -> None:
         if value.my_deck:
-            value.my_deck.cards.remove(value)
-        self.cards.append(value)
+            value.my_deck.remove(value)
+        self._append(value)
         value.my_deck = self
+        if check_invariants:
+            self.verify()
+
+    def remove(self, value: AudioCard) -> None:
+        """Removes the card by identity."""
+        ix: int | None = self._positions.pop(id(value), None)
+        if ix is None:
+            raise ValueError(f"Card {value.data.card_id} is not in the deck.")
+        slots: list[AudioCard | None] = self._slots
+        slots[ix] = None
+        value.my_deck = None
+        if not self._positions:
+            self.cards = list()
+        elif len(slots) - len(self._positions) > len(self._positions) + 64:
+            self.cards = self.cards
+        else:
+            while slots[self._head] is None:
+                self._head += 1
+        if check_invariants:
+            self.verify()
+
+    def verify(self) -> None:
+        count: int = 0
+        for ix, card in enumerate(self._slots):
+            if card is None:
+                continue
+            if card.my_deck is not self:
+                raise RuntimeError(f"Card {card.data.card_id} is in a deck other than its own.")
+            if self._positions.get(id(card)) != ix:
+                raise RuntimeError(f"Card {card.data.card_id} is in the deck more than once.")
+            if ix < self._head:
+                raise RuntimeError(f"Card {card.data.card_id} is before the top of the deck.")
+            count += 1
+        if count != len(self._positions):
+            raise RuntimeError(f"Deck has {count:,} cards for {len(self._positions):,} positions.")
 
     @property
     def next_show_time(self) -> float:
-        if not self.cards:
+        if not self._positions:
             return 0.0
         delay: float = self.top_card.card_stats.show_again_delay
         return 0.0 if delay < 0.0 else delay
 
     @property
     def top_card(self) -> AudioCard | None:
-        if not self.cards:
+        if not self._positions:
             return None
-        return self.cards[0]
+        return self._slots[self._head]
 
     @property
     def has_cards(self) -> bool:
-        return True if self.cards else False
+        return True if self._positions else False
+
+
+@dataclass(slots=True)
+class LeitnerQueueDeck(MutableSequence):
+    """
+    Same API as LeitnerAudioDeck, for decks holding many cards. Show again delays are kept as due times against a
+    deck clock, so update_time only advances the clock, and the top card comes from a heap ordered by due time
+    then by position in the deck. A card's show_again_delay is brought up to date when it leaves the deck or
+    when the cards are listed.
+    """
+
+    clock: float = 0.0
+    members: dict[int, tuple[AudioCard, float, int]] = field(default_factory=dict)  # id => card, due, seq
+    heap: list[tuple[float, int, AudioCard]] = field(default_factory=list)
+    seq: int = 0
+
+    def _delay(self, due: float) -> float:
+        return max(due - self.clock, 0.0)
+
+    @property
+    def cards(self) -> list[AudioCard]:
+        """The cards in deck order, with their show again delays updated."""
+        cards: list[AudioCard] = list()
+        for card, due, _ in self.members.values():
+            card.card_stats.show_again_delay = self._delay(due)
+            cards.append(card)
+        return cards
+
+    def update_time(self, delta_secs: float) -> None:
+        self.clock += delta_secs
+
+    def sort_by_show_again(self) -> None:
+        cards: list[AudioCard] = self.cards
+        rand.shuffle(cards)
+        cards.sort(key=lambda card: card.card_stats.show_again_delay)
+        self._rebuild([(card, self.clock + card.card_stats.show_again_delay) for card in cards])
+
+    def _rebuild(self, cards: list[tuple[AudioCard, float]]) -> None:
+        self.members.clear()
+        self.heap.clear()
+        self.seq = 0
+        for card, due in cards:
+            self.heap.append(self._add(card, due))
+        heapq.heapify(self.heap)
+
+    def _add(self, card: AudioCard, due: float) -> tuple[float, int, AudioCard]:
+        self.members[id(card)] = (card, due, self.seq)
+        self.seq += 1
+        return due, self.seq - 1, card
+
+    def _rebuild_cards(self, cards: list[AudioCard]) -> None:
+        self._rebuild([(card, self.clock + card.card_stats.show_again_delay) for card in cards])
+
+    def insert(self, index: int, value: AudioCard) -> None:
+        if value.my_deck:
+            value.my_deck.remove(value)
+        cards: list[AudioCard] = self.cards
+        cards.insert(index, value)
+        value.my_deck = self
+        self._rebuild_cards(cards)
+
+    def __getitem__(self, i: int) -> AudioCard:
+        return self.cards[i]
+
+    def __setitem__(self, i: int | slice, o: AudioCard) -> None:
+        if isinstance(i, slice):
+            raise TypeError("Deck cards are replaced one at a time so each card's deck is kept in step.")
+        if o.my_deck:
+            o.my_deck.remove(o)
+        cards: list[AudioCard] = self.cards
+        cards[i].my_deck = None
+        cards[i] = o
+        o.my_deck = self
+        self._rebuild_cards(cards)
+
+    def __delitem__(self, i: int | slice) -> None:
+        cards: list[AudioCard] = self.cards
+        for card in cards[i] if isinstance(i, slice) else [cards[i]]:
+            card.my_deck = None
+        del cards[i]
+        self._rebuild_cards(cards)
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __contains__(self, value: AudioCard) -> bool:
+        return id(value) in self.members
+
+    def append(self, value: AudioCard) -> None:
+        if value.my_deck:
+            value.my_deck.remove(value)
+        heapq.heappush(self.heap, self._add(value, self.clock + value.card_stats.show_again_delay))
+        value.my_deck = self
+        if check_invariants:
+            self.verify()
+
+    def remove(self, value: AudioCard) -> None:
+        card, due, _ = self.members.pop(id(value))
+        card.card_stats.show_again_delay = self._delay(due)
+        card.my_deck = None
+        if len(self.heap) > 2 * len(self.members) + 64:
+            self._rebuild([(card, due) for card, due, _ in self.members.values()])
+        if check_invariants:
+            self.verify()
+
+    def verify(self) -> None:
+        for key, (card, due, seq) in self.members.items():
+            if key != id(card) or card.my_deck is not self:
+                raise RuntimeError(f"Card {card.data.card_id} is in a deck other than its own.")
+        live: int = sum(1 for _, seq, card in self.heap
+                        if id(card) in self.members and self.members[id(card)][2] == seq)
+        if live != len(self.members):
+            raise RuntimeError(f"Deck heap has {live:,} live entries for {len(self.members):,} cards.")
+
+    @property
+    def next_show_time(self) -> float:
+        if not self.members:
+            return 0.0
+        return self._delay(self._top()[0])
 
+    def _top(self) -> tuple[float, int, AudioCard]:
+        """Drops heap entries of cards no longer in the deck."""
+        while True:
+            due, seq, card = self.heap[0]
+            member: tuple[AudioCard, float, int] | None = self.members.get(id(card))
+            if member and member[2] == seq:
+                return self.heap[0]
+            heapq.heappop(self.heap)
 
+    @property
+    def top_card(self) -> AudioCard | None:
+        if not self.members:
+            return None
+        return self._top()[2]
+
+    @property
+    def has_cards(self) -> bool:
+        return True if self.members else False
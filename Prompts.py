@@ -1,104 +1,76 @@
+"""
+Instructor prompts, declared as text by tag and synthesized with the instructor's voice on first use.
+
+The prompts with a date in them are templates, filled in when the prompt library is created, so only they
+change from day to day. Synthesized prompts are cached by text hash like any other English clip, along with
+their normalized PCM sidecars, so a prompt is neither synthesized nor decoded again while its text is the same.
+"""
+from __future__ import annotations
+
+import dataclasses
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Mapping
 from datetime import datetime
-from pydub import AudioSegment
 
-from tts import en_audio
+from tts import TTSBatchEntry
+from tts import get_mp3_en
+from tts import tts_en_batch
 
 AMZ_VOICE_INSTRUCTOR: str = "Matthew"
 
+# Templates filled in with the date when the library is created.
+DATED_PROMPTS: tuple[str, ...] = ("produced", "copy_1")
 
-def create_prompts() -> dict[str, AudioSegment]:
-    print("Creating instructor prompts")
-    prompts: dict[str, AudioSegment] = dict()
-    voice: str = AMZ_VOICE_INSTRUCTOR
-
-    tag: str = "also_hear"
-    text: str = "You will also hear the following:"
-    prompts[tag] = en_audio(voice, text)
-
-    tag: str = "also_hear_short"
-    text: str = "Also:"
-    prompts[tag] = en_audio(voice, text)
-
-    tag: str = "produced"
-    text: str = f"""
+PROMPTS: dict[str, str] = {
+    "also_hear": "You will also hear the following:",
+    "also_hear_short": "Also:",
+    "produced": """
     This audio file was produced on
-    {datetime.today().strftime("%B %d, %Y")}
+    {date}
     by Michael Conrad."
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag: str = "first_phrase"
-    text: str = "Here is your first phrase to learn for this session. Listen carefully:"
-    prompts[tag] = en_audio(voice, text)
-
-    tag: str = "language_culture_1"
-    text: str = """
+    """,
+    "first_phrase": "Here is your first phrase to learn for this session. Listen carefully:",
+    "language_culture_1": """
     Language and culture which are not shared and taught openly and freely will die.
     If our language and culture die, then, as a people, so do we.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "copy_1"
-    text = f"Production copyright {datetime.utcnow().year} by Michael Conrad."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "copy_by_sa"
-    text = f"""
+    """,
+    "copy_1": "Production copyright {year} by Michael Conrad.",
+    "copy_by_sa": """
     This work is licensed to you under the Creative Commons Attribution Share-Alike license.
     To obtain a copy of this license please look up Creative Commons online.
     You are free to share, copy, and distribute this work.
     If you alter, build upon, or transform this work, you must use the same license on the resulting work.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "copy_by_nc"
-    text = f"""
+    """,
+    "copy_by_nc": """
     This work is licensed to you under the Creative Commons Attribution Non-Commercial license.
     To obtain a copy of this license please look up Creative Commons online.
     You are free to share and adapt this work. If you alter, build upon, or transform this work,
     you must use the same license on the resulting work.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "is_derived"
-    text = "This is a derived work."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "is_derived_cherokee_nation"
-    text = """
+    """,
+    "is_derived": "This is a derived work.",
+    "is_derived_cherokee_nation": """
     This is a derived work. Permission to use the original Cherokee audio and print materials for
     non-commercial use granted by "The Cherokee Nation of Oklahoma".
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "walc1_attribution"
-    text = """
+    """,
+    "walc1_attribution": """
     Original audio copyright 2018 by the Cherokee Nation of Oklahoma.
     The contents of the "We are Learning Cherokee Level 1" textbook were developed by Durbin Feeling,
     Patrick Rochford, Anna Sixkiller, David Crawler, John Ross, Dennis Sixkiller, Ed Fields, Edna Jones,
     Lula Elk, Lawrence Panther, Jeff Edwards, Zachary Barnes, Wade Blevins, and Roy Boney, Jr.";
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "intro_1"
-    text = """
+    """,
+    "intro_1": """
     In these sessions, you will learn Cherokee phrases by responding with each phrase's English
     translation. Each new phrase will be introduced with it's English translation. You will then be
     prompted to translate different phrases into English. It is important to respond aloud.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "intro_3"
-    text = """
+    """,
+    "intro_3": """
     In these sessions, you will learn by responding aloud in English.
     Each phrase will be introduced with an English translation.
     As the sessions progress you will be prompted to translate different phrases into English.
     It is important to respond aloud.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "intro_2"
-    text = """
+    """,
+    "intro_2": """
         About the pronoun, "you". In English this pronoun can refer to
         1 person, 2 people, or more people.
         Cherokee has three different forms for, "you".
@@ -107,11 +79,8 @@ def create_prompts() -> dict[str, AudioSegment]:
         When you hear the word, "you", assume it refers to one person
         unless it is accompanied by
         the word, "both", or the word, "all".
-        """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "keep_going"
-    text = """
+        """,
+    "keep_going": """
     Do not become discouraged while doing these sessions.
     Note: It is important to not do tomorrow's session today.
     The learning method of graduated interval recall that this material uses
@@ -125,119 +94,57 @@ def create_prompts() -> dict[str, AudioSegment]:
     On day three only do the session for day three.
      You can repeat day three's session as many times as you like during the day.
     And so forth.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "begin"
-    text = "Let us begin."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "learn_sounds_first"
-    text = """
+    """,
+    "begin": "Let us begin.",
+    "learn_sounds_first": """
     Only after you have learned how the words in Cherokee sound and how they are used together will you
     be able to speak Cherokee. This material is designed to assist with learning these sounds and word
     combinations. This is the way young children learn their first language or languages.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "new_phrase"
-    text = "Here is a new phrase to learn. Listen carefully:"
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "new_phrase_short"
-    text = "Here is a new phrase:"
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "translate"
-    text = "Translate into English:"
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "translate_short"
-    text = "Translate:"
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "listen_again"
-    text = "Here is the phrase again:"
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "listen_again_short"
-    text = "Again:"
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "its_translation_is"
-    text = "Here it is in English:"
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "in_english"
-    text = "In English:"
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "concludes_this_exercise"
-    text = "This concludes this audio exercise."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "cll1-v3"
-    text = "Cherokee Language Lessons 1. 3rd Edition."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "cll2"
-    text = "Cherokee Language Lessons 2. 1st Edition."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "ced-sentences"
-    text = "Example sentences. Cherokee English Dictionary, 1st edition."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "bound-pronouns"
-    text = "Bound Pronouns Training."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "ced-mco"
-    text = "Cherokee English Dictionary Vocabulary Cram."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "osiyo-tohiju-then-what"
-    text = "Conversation Starters in Cherokee."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "wwacc"
-    text = "Advanced Conversational Cherokee."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "walc-1"
-    text = "We are learning Cherokee - Book 1."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "animals"
-    text = "Cherokee animal names."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "cll1-v3-about"
-    text = """
+    """,
+    "new_phrase": "Here is a new phrase to learn. Listen carefully:",
+    "new_phrase_short": "Here is a new phrase:",
+    "translate": "Translate into English:",
+    "translate_short": "Translate:",
+    "listen_again": "Here is the phrase again:",
+    "listen_again_short": "Again:",
+    "its_translation_is": "Here it is in English:",
+    "in_english": "In English:",
+    "concludes_this_exercise": "This concludes this audio exercise.",
+    "short-speech": """
+    Much the same way that English speakers shorten phrases such as “do not” into “don't” and “can not” into “can't”,
+     Cherokee speakers also shorten phrases by dropping certain vowels, syllables, and words in everyday speech.
+     Vocabulary will be introduced using the long form of the word or phrase.
+     Many challenges will be using a mixture of full and short forms.
+    """,
+}
+
+# Dataset titles and descriptions by dataset name, and dataset name + "-about".
+DATASET_PROMPTS: dict[str, str] = {
+    "cll1-v3": "Cherokee Language Lessons 1. 3rd Edition.",
+    "cll2": "Cherokee Language Lessons 2. 1st Edition.",
+    "ced-sentences": "Example sentences. Cherokee English Dictionary, 1st edition.",
+    "bound-pronouns": "Bound Pronouns Training.",
+    "ced-mco": "Cherokee English Dictionary Vocabulary Cram.",
+    "osiyo-tohiju-then-what": "Conversation Starters in Cherokee.",
+    "wwacc": "Advanced Conversational Cherokee.",
+    "walc-1": "We are learning Cherokee - Book 1.",
+    "animals": "Cherokee animal names.",
+    "cll1-v3-about": """
     These audio exercise sessions complement the book 'Cherokee Language Lessons 1', 3rd Edition, by Michael Conrad.
     Each set of audio exercises should be completed before working through the 
     corresponding material in the book. The audio will indicate when you should
     switch to the book exercises.
     By the time you complete the assigned sessions, you should have
     little to no difficulty with reading the Cherokee in the chapter texts.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "cll2-about"
-    text = """
+    """,
+    "cll2-about": """
         These audio exercise sessions complement the book 'Cherokee Language Lessons 2', 1st Edition, by Michael Conrad.
         Each set of audio exercises should be completed before working through the 
         corresponding material in the book. The audio will indicate when you should
         switch to the book exercises.
-        """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "beginning-cherokee"
-    text = "Beginning Cherokee. 2nd Edition."
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "beginning-cherokee-about"
-    text = """
+        """,
+    "beginning-cherokee": "Beginning Cherokee. 2nd Edition.",
+    "beginning-cherokee-about": """
         These audio exercise sessions were created to complement
         the book 'Beginning Cherokee', 2nd Edition, by Ruth Bradley Holmes and Betty Sharp Smith.
         Each set of audio exercises should be completed before working through the 
@@ -245,74 +152,86 @@ def create_prompts() -> dict[str, AudioSegment]:
         The audio will indicate when you should switch to the book exercises.
         By the time you complete the assigned audio exercises, you should have
         little to no difficulty with reading the Cherokee in the chapter texts.
-        """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "ced-sentences-about"
-    text = """
+        """,
+    "ced-sentences-about": """
         These audio exercise sessions complement the 'Cherokee English Dictionary', 1st Edition.
         Vocabulary is based on the example sentences from each dictionary entry.
-        """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "bound-pronouns-about"
-    text = """
+        """,
+    "bound-pronouns-about": """
     These sessions closely follow the vocabulary from the Bound Pronouns app.
     These exercises are designed to assist
     with learning the different singular
     and plural bound pronoun combinations.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "two-men-hunting-about"
-    text = """
+    """,
+    "two-men-hunting-about": """
     These sessions closely follow the vocabulary from the story entitled, 'Two Hunters',
     as recorded in the Cherokee English Dictionary, 1st edition.
     By the time you have completed these exercises you should be able to understand
     the full spoken story without any difficulty.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "ced-mco-about"
-    text = """
+    """,
+    "ced-mco-about": """
     These sessions use vocabulary taken from the Cherokee English Dictionary, 1st Edition.
     The pronunciations are based on the pronunciation markings as found in the dictionary.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "osiyo-tohiju-then-what-about"
-    text = """
+    """,
+    "osiyo-tohiju-then-what-about": """
     These sessions closely follow the book entitled, 'Conversation Starters in Cherokee', by Prentice Robinson.
     The pronunciations are based on the pronunciation markings as found in the official
     Cherokee English Dictionary - 1st Edition.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "wwacc-about"
-    text = """
+    """,
+    "wwacc-about": """
     These sessions closely follow the booklet entitled, 'Advanced Conversational Cherokee', by Willard Walker.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "walc-1-about"
-    text = """
+    """,
+    "walc-1-about": """
     These sessions closely follow the lesson material 'We are learning Cherokee - Book 1'.
-    """
-    prompts[tag] = en_audio(voice, text)
-
-    tag = "animals-about"
-    text = """
+    """,
+    "animals-about": """
     These sessions closely follow the vocabulary from the Animals app.
-    """
-    prompts[tag] = en_audio(voice, text)
+    """,
+}
 
-    tag = "short-speech"
-    text = """
-    Much the same way that English speakers shorten phrases such as “do not” into “don't” and “can not” into “can't”,
-     Cherokee speakers also shorten phrases by dropping certain vowels, syllables, and words in everyday speech.
-     Vocabulary will be introduced using the long form of the word or phrase.
-     Many challenges will be using a mixture of full and short forms.
-    """
-    prompts[tag] = en_audio(voice, text)
 
-    return prompts
+@dataclasses.dataclass(slots=True)
+class PromptLibrary(Mapping):
+    """The MP3 file of each instructor prompt by tag, synthesized when first looked up or prefetched."""
+    voice: str = AMZ_VOICE_INSTRUCTOR
+    today: datetime = dataclasses.field(default_factory=datetime.today)
+    files: dict[str, str] = dataclasses.field(default_factory=dict)
+
+    def __getitem__(self, tag: str) -> str:
+        if tag not in self.files:
+            self.prefetch([tag])
+        return self.files[tag]
+
+    def __contains__(self, tag: object) -> bool:
+        return tag in PROMPTS or tag in DATASET_PROMPTS
+
+    def __iter__(self) -> Iterator[str]:
+        yield from PROMPTS
+        yield from DATASET_PROMPTS
+
+    def __len__(self) -> int:
+        return len(PROMPTS) + len(DATASET_PROMPTS)
+
+    def text(self, tag: str) -> str:
+        text: str = PROMPTS[tag] if tag in PROMPTS else DATASET_PROMPTS[tag]
+        if tag in DATED_PROMPTS:
+            text = text.format(date=self.today.strftime("%B %d, %Y"), year=self.today.year)
+        return text
+
+    def prefetch(self, tags: Iterable[str]) -> None:
+        """Synthesizes the prompts not yet looked up among tags, concurrently."""
+        files: dict[str, str] = dict()
+        entries: list[TTSBatchEntry] = list()
+        for tag in tags:
+            if tag in self.files or tag in files or tag not in self:
+                continue
+            text: str = self.text(tag)
+            files[tag] = get_mp3_en(self.voice, text)
+            entries.append(TTSBatchEntry(self.voice, text))
+        tts_en_batch(entries)
+        self.files.update(files)
+
+
+def create_prompts() -> PromptLibrary:
+    """Returns the instructor prompts by tag. Each prompt is synthesized when first looked up."""
+    return PromptLibrary()
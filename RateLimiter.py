@@ -0,0 +1,26 @@
+"""
+Spaces out calls made from many threads so that no more than `rate` calls start per second.
+"""
+from __future__ import annotations
+
+import dataclasses
+import threading
+import time
+
+
+@dataclasses.dataclass(slots=True)
+class RateLimiter:
+    rate: float = 8.0  # Calls per second. Zero or less disables the limit.
+    next_time: float = 0.0
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock, repr=False)
+
+    def wait(self) -> None:
+        """Blocks until the caller may start its call."""
+        if self.rate <= 0:
+            return
+        with self.lock:
+            now: float = time.monotonic()
+            start: float = max(now, self.next_time)
+            self.next_time = start + 1.0 / self.rate
+        if start > now:
+            time.sleep(start - now)
@@ -0,0 +1,67 @@
+"""
+Review sheets list a deck's vocabulary for study away from the audio, one row per card, in either direction.
+
+Rows are written to the file as the cards are read, as TSV, CSV, or a JSON array with one object per line.
+"""
+from __future__ import annotations
+
+import csv
+import pathlib
+from collections.abc import Iterable
+
+import simplejson
+
+from LeitnerAudioDeck import AudioCard
+
+REVIEW_SHEET_FORMATS: tuple[str, ...] = ("tsv", "csv", "json")
+
+# Columns by direction, named by AudioData attribute.
+DIRECTIONS: dict[str, list[str]] = {
+    "chr-en": ["card_id", "bound_pronoun", "verb_stem", "challenge", "answer"],
+    "en-chr": ["card_id", "bound_pronoun", "verb_stem", "answer", "challenge"],
+}
+
+
+def write_review_sheet(cards: Iterable[AudioCard], destination: pathlib.Path, direction: str = "chr-en",
+                       sheet_format: str = "tsv") -> int:
+    """Writes a row per card and returns the row count."""
+    if sheet_format not in REVIEW_SHEET_FORMATS:
+        raise ValueError(f"Unknown review sheet format: {sheet_format}")
+    columns: list[str] = DIRECTIONS[direction]
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file: pathlib.Path = destination.with_name(destination.name + ".tmp")
+    rows: int = 0
+    with open(tmp_file, "w", newline="") as w:
+        if sheet_format == "csv":
+            csv_writer = csv.writer(w)
+            csv_writer.writerow(columns)
+        elif sheet_format == "tsv":
+            w.write("\t".join(columns) + "\n")
+        else:
+            w.write("[")
+        for card in cards:
+            values: list[str] = [str(getattr(card.data, column)) for column in columns]
+            if sheet_format == "csv":
+                csv_writer.writerow(values)
+            elif sheet_format == "tsv":
+                w.write("\t".join(" ".join(value.split()) for value in values) + "\n")
+            else:
+                w.write(",\n" if rows else "\n")
+                w.write(simplejson.dumps(dict(zip(columns, values)), ensure_ascii=False))
+            rows += 1
+        if sheet_format == "json":
+            w.write("\n]\n")
+    tmp_file.replace(destination)
+    return rows
+
+
+def export_review_sheets(cards: list[AudioCard], out_dir: str, dataset: str, sheet_format: str = "tsv") \
+        -> list[pathlib.Path]:
+    """Writes a review sheet for each direction into out_dir."""
+    sheets: list[pathlib.Path] = list()
+    for direction in DIRECTIONS:
+        destination: pathlib.Path = pathlib.Path(out_dir, f"{dataset}-review-sheet-{direction}.{sheet_format}")
+        rows: int = write_review_sheet(cards, destination, direction, sheet_format)
+        print(f"Review sheet written to {destination}: {rows:,} cards.")
+        sheets.append(destination)
+    return sheets
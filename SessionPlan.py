@@ -0,0 +1,44 @@
+"""
+Everything needed to render one session after the Leitner scheduling for all sessions is done.
+
+A plan holds no audio. The timeline refers to clips by their cache file names, so plans can be written
+as JSON or sent to other processes for rendering.
+"""
+from dataclasses import dataclass
+from dataclasses import field
+
+from dataclasses_json import dataclass_json
+
+from SrtEntry import SrtEntry
+
+
+@dataclass_json
+@dataclass
+class PlannedCard:
+    card_id: str = ""
+    challenge: str = ""
+    new_card: bool = False
+    introduced: bool = False
+    voices: list[str] = field(default_factory=list)  # Voices in the order they are heard.
+
+
+@dataclass_json
+@dataclass
+class SessionPlan:
+    session: int = 0  # Zero based, the same as the exercise set counter.
+    cards: list[PlannedCard] = field(default_factory=list)
+    timeline: dict = field(default_factory=dict)  # SessionTimeline.to_dict()
+    srt_entries: list[SrtEntry] = field(default_factory=list)
+    tags: dict[str, str] = field(default_factory=dict)
+    new_cards: list[str] = field(default_factory=list)
+    hidden_cards: list[str] = field(default_factory=list)
+    review_cards: list[str] = field(default_factory=list)
+    end_note: str = ""
+    new_count: int = 0  # Introduced plus hidden new cards.
+    review_count: int = 0
+
+    @property
+    def duration_seconds(self) -> float:
+        if not self.timeline:
+            return 0.0
+        return self.timeline["frames"] / self.timeline["frame_rate"]
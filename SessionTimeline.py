@@ -0,0 +1,230 @@
+"""
+A session timeline records the clips and silences making up a session track, in order, with their frame offsets.
+
+Durations are computed from the frame counts as entries are added, and the final PCM is only produced once,
+when the timeline is rendered. This replaces building a track with repeated AudioSegment.append calls, each
+of which copies the whole growing track.
+
+Crossfades follow the same rules as AudioSegment.append: the default is 100 ms, where the end of the
+timeline is faded out and overlaid with the faded in start of the appended audio.
+
+Clips added by file name are only loaded when rendering, which lets a timeline be planned in one process,
+saved with to_dict, and rendered in another.
+"""
+from __future__ import annotations
+
+import dataclasses
+import subprocess
+import tempfile
+from collections.abc import Callable
+from collections.abc import Iterator
+
+from pydub import AudioSegment
+
+CHUNK_FRAMES: int = 48_000 * 10
+RAW_FORMATS: dict[int, str] = {1: "u8", 2: "s16le", 4: "s32le"}  # By sample width.
+
+
+@dataclasses.dataclass(slots=True)
+class TimelineEntry:
+    offset: int = 0  # First frame of the entry in the timeline.
+    frames: int = 0
+    crossfade: int = 0  # Frames overlapping the end of the preceding entries.
+    file: str = ""  # Clip file, loaded at render time.
+    audio: AudioSegment | SessionTimeline | None = None  # None without a file is silence.
+
+    def to_dict(self) -> dict:
+        data: dict = {"offset": self.offset, "frames": self.frames, "crossfade": self.crossfade}
+        if isinstance(self.audio, SessionTimeline):
+            data["timeline"] = self.audio.to_dict()
+        elif self.audio is not None:
+            raise ValueError("Only clips appended by file can be saved.")
+        elif self.file:
+            data["file"] = self.file
+        return data
+
+
+@dataclasses.dataclass(slots=True)
+class SessionTimeline:
+    frame_rate: int = 48_000
+    channels: int = 1
+    sample_width: int = 2
+    frames: int = 0
+    entries: list[TimelineEntry] = dataclasses.field(default_factory=list)
+    loader: Callable[[str], AudioSegment] | None = dataclasses.field(default=None, repr=False, compare=False)
+
+    @property
+    def frame_width(self) -> int:
+        return self.channels * self.sample_width
+
+    @property
+    def duration_seconds(self) -> float:
+        return self.frames / self.frame_rate
+
+    def __len__(self) -> int:
+        """Length in milliseconds, the same as AudioSegment."""
+        return round(1000 * self.duration_seconds)
+
+    def frame_count(self, ms: float) -> int:
+        return int(self.frame_rate * (ms / 1000.0))
+
+    def append(self, audio: AudioSegment | SessionTimeline, crossfade: int = 100) -> None:
+        frames: int
+        if isinstance(audio, SessionTimeline):
+            if (audio.frame_rate, audio.channels, audio.sample_width) \
+                    != (self.frame_rate, self.channels, self.sample_width):
+                raise ValueError("Timelines must have the same frame rate, channels, and sample width.")
+            frames = audio.frames
+        else:
+            audio = self._conform(audio)
+            frames = int(audio.frame_count())
+        self._add(TimelineEntry(frames=frames, audio=audio), crossfade)
+
+    def append_clip(self, file: str, frames: int, crossfade: int = 100) -> None:
+        """Adds a clip by file name. The clip is loaded with the timeline's loader when rendered."""
+        self._add(TimelineEntry(frames=frames, file=file), crossfade)
+
+    def append_silence(self, duration: int = 1000, crossfade: int = 100) -> None:
+        self._add(TimelineEntry(frames=self.frame_count(duration)), crossfade)
+
+    def _add(self, entry: TimelineEntry, crossfade: int) -> None:
+        xf: int = self.frame_count(crossfade) if self.entries else 0
+        if xf > self.frames:
+            raise ValueError(f"Crossfade is longer than the timeline ({crossfade}ms > {len(self)}ms)")
+        if xf > entry.frames:
+            raise ValueError(f"Crossfade is longer than the appended audio ({crossfade}ms)")
+        entry.crossfade = xf
+        entry.offset = self.frames - xf
+        self.entries.append(entry)
+        self.frames += entry.frames - xf
+
+    def _conform(self, audio: AudioSegment) -> AudioSegment:
+        if audio.channels != self.channels:
+            audio = audio.set_channels(self.channels)
+        if audio.frame_rate != self.frame_rate:
+            audio = audio.set_frame_rate(self.frame_rate)
+        if audio.sample_width != self.sample_width:
+            audio = audio.set_sample_width(self.sample_width)
+        return audio
+
+    def _segment(self, data: bytes) -> AudioSegment:
+        return AudioSegment(data=data, sample_width=self.sample_width, frame_rate=self.frame_rate,
+                            channels=self.channels)
+
+    def _iter_entry(self, entry: TimelineEntry, chunk_frames: int) -> Iterator[bytes]:
+        chunk_size: int = chunk_frames * self.frame_width
+        if entry.audio is None and not entry.file:
+            remaining: int = entry.frames * self.frame_width
+            while remaining > 0:
+                size: int = min(remaining, chunk_size)
+                yield bytes(size)
+                remaining -= size
+        elif isinstance(entry.audio, SessionTimeline):
+            yield from entry.audio.iter_raw(chunk_frames)
+        else:
+            audio: AudioSegment = entry.audio
+            if audio is None:
+                audio = self._conform(self.loader(entry.file))
+                if audio.frame_count() != entry.frames:
+                    raise ValueError(f"{entry.file} has {int(audio.frame_count()):,} frames,"
+                                     f" not the planned {entry.frames:,}.")
+            raw: memoryview = memoryview(audio.raw_data)
+            for start in range(0, len(raw), chunk_size):
+                yield raw[start:start + chunk_size]
+
+    def _crossfade(self, tail: bytes, head: bytes) -> bytes:
+        fade_out: AudioSegment = self._segment(tail).fade(to_gain=-120, start=0, end=float("inf"))
+        fade_in: AudioSegment = self._segment(head).fade(from_gain=-120, start=0, end=float("inf"))
+        return (fade_out * fade_in).raw_data
+
+    def iter_raw(self, chunk_frames: int = CHUNK_FRAMES) -> Iterator[bytes]:
+        """Yields the rendered PCM in order, in chunks of about chunk_frames frames."""
+        chunk_size: int = chunk_frames * self.frame_width
+        pending: bytearray = bytearray()
+        for ix, entry in enumerate(self.entries):
+            data: Iterator[bytes] = self._iter_entry(entry, chunk_frames)
+            if entry.crossfade:
+                xf: int = entry.crossfade * self.frame_width
+                head: bytearray = bytearray()
+                for chunk in data:
+                    head += chunk
+                    if len(head) >= xf:
+                        break
+                pending[-xf:] = self._crossfade(bytes(pending[-xf:]), bytes(head[:xf]))
+                pending += head[xf:]
+            # Hold back whatever the next entry will crossfade with.
+            hold: int = 0
+            if ix + 1 < len(self.entries):
+                hold = self.entries[ix + 1].crossfade * self.frame_width
+            for chunk in data:
+                pending += chunk
+                if len(pending) - hold >= chunk_size:
+                    cut: int = len(pending) - hold
+                    yield bytes(pending[:cut])
+                    del pending[:cut]
+        if pending:
+            yield bytes(pending)
+
+    def render(self) -> AudioSegment:
+        """Renders the timeline into a single preallocated buffer."""
+        buffer: bytearray = bytearray(self.frames * self.frame_width)
+        position: int = 0
+        for chunk in self.iter_raw():
+            buffer[position:position + len(chunk)] = chunk
+            position += len(chunk)
+        return self._segment(bytes(buffer))
+
+    def export(self, output: str, format: str = "mp3", frame_rate: int | None = None,
+               parameters: list[str] | None = None, tags: dict[str, str] | None = None,
+               chunk_frames: int = CHUNK_FRAMES) -> None:
+        """
+        Encodes the timeline by streaming its PCM into ffmpeg, one chunk at a time, so memory use is bounded by
+        the chunk size and not by the length of the track. ffmpeg resamples to frame_rate as it encodes.
+        """
+        cmd: list[str] = [AudioSegment.converter, "-nostdin", "-y", "-hide_banner", "-loglevel", "error"]
+        cmd.extend(["-f", RAW_FORMATS[self.sample_width], "-ar", str(self.frame_rate), "-ac", str(self.channels)])
+        cmd.extend(["-i", "pipe:0"])
+        if frame_rate and frame_rate != self.frame_rate:
+            cmd.extend(["-ar", str(frame_rate)])
+        if parameters:
+            cmd.extend(parameters)
+        for key, value in (tags or dict()).items():
+            cmd.extend(["-metadata", f"{key}={value}"])
+        if format == "mp3":
+            cmd.extend(["-id3v2_version", "4"])
+        cmd.extend(["-f", format, output])
+        # stderr goes to a file, since a full pipe nobody reads until the end would block ffmpeg and this write loop.
+        with tempfile.TemporaryFile() as stderr_file:
+            process: subprocess.Popen = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=stderr_file)
+            try:
+                for chunk in self.iter_raw(chunk_frames):
+                    process.stdin.write(chunk)
+            except BrokenPipeError:
+                pass  # ffmpeg exited early; its return code and message are reported below.
+            finally:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                process.wait()
+            stderr_file.seek(0)
+            stderr: bytes = stderr_file.read()
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with {process.returncode} encoding {output}:"
+                               f" {stderr.decode('UTF-8', errors='replace').strip()}")
+
+    def to_dict(self) -> dict:
+        return {"frame_rate": self.frame_rate, "channels": self.channels, "sample_width": self.sample_width,
+                "frames": self.frames, "entries": [entry.to_dict() for entry in self.entries]}
+
+    @staticmethod
+    def from_dict(data: dict, loader: Callable[[str], AudioSegment] | None = None) -> SessionTimeline:
+        timeline: SessionTimeline = SessionTimeline(data["frame_rate"], data["channels"], data["sample_width"],
+                                                    data["frames"], loader=loader)
+        for item in data["entries"]:
+            entry: TimelineEntry = TimelineEntry(item["offset"], item["frames"], item["crossfade"],
+                                                 item.get("file", ""))
+            if "timeline" in item:
+                entry.audio = SessionTimeline.from_dict(item["timeline"], loader)
+            timeline.entries.append(entry)
+        return timeline
@@ -0,0 +1,102 @@
+"""
+A long-lived IMS-Toucan synthesis process, so the model is loaded once instead of once per utterance or batch.
+
+The protocol is one JSON object per line. Once its model is loaded, the worker writes {"ready": true} to its
+stdout. Each request sent on its stdin is then answered by one line on its stdout, in the order the requests
+finish:
+
+    request:  {"id": 1, "lang": "chr", "text": "...", "ref": "/path/voice.wav", "alpha": 1.3, "mp3": "/path/x.mp3"}
+    response: {"id": 1}  or  {"id": 1, "error": "..."}
+
+Output lines not starting with "{" are taken as worker logging and ignored. Any command speaking the protocol
+can be used: run_tts_worker.py runs IMS-Toucan, and fake_tts_worker.py stands in for it without a model.
+"""
+from __future__ import annotations
+
+import dataclasses
+import subprocess
+import threading
+from collections.abc import Iterator
+
+import simplejson
+
+
+@dataclasses.dataclass(slots=True)
+class ToucanRequest:
+    id: int = 0
+    lang: str = "chr"
+    text: str = ""
+    ref: str = ""  # Reference voice wav. Empty for the model's default voice.
+    alpha: float | None = None
+    mp3: str = ""
+
+
+@dataclasses.dataclass(slots=True)
+class ToucanResult:
+    id: int = 0
+    error: str = ""
+
+
+@dataclasses.dataclass(slots=True)
+class ToucanWorker:
+    cmd: list[str] = dataclasses.field(default_factory=list)
+    env: dict[str, str] | None = None
+    process: subprocess.Popen | None = None
+    lock: threading.Lock = dataclasses.field(default_factory=threading.Lock, repr=False)
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self) -> None:
+        """Starts the worker and waits until it is ready. Raises RuntimeError if it exits first."""
+        if self.alive():
+            return
+        self.process = subprocess.Popen(self.cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+                                        encoding="UTF-8", bufsize=1, env=self.env)
+        for line in self.process.stdout:
+            if line.startswith("{") and simplejson.loads(line).get("ready"):
+                return
+        returncode: int = self.process.wait()
+        self.process = None
+        raise RuntimeError(f"IMS-Toucan worker exited with {returncode} before it was ready.")
+
+    def synthesize(self, requests: list[ToucanRequest]) -> Iterator[ToucanResult]:
+        """Sends all the requests and yields each result as soon as the worker reports it."""
+        with self.lock:
+            self.start()
+            pending: set[int] = {request.id for request in requests}
+            writer: threading.Thread = threading.Thread(target=self._send, args=(requests,), daemon=True)
+            writer.start()
+            while pending:
+                line: str = self.process.stdout.readline()
+                if not line:
+                    self.process.wait()
+                    raise RuntimeError(f"IMS-Toucan worker exited with {self.process.returncode}"
+                                       f" and {len(pending):,} requests pending.")
+                if not line.startswith("{"):
+                    continue
+                response: dict = simplejson.loads(line)
+                result: ToucanResult = ToucanResult(response["id"], response.get("error", ""))
+                pending.discard(result.id)
+                yield result
+            writer.join()
+
+    def _send(self, requests: list[ToucanRequest]) -> None:
+        try:
+            for request in requests:
+                self.process.stdin.write(simplejson.dumps(dataclasses.asdict(request), ensure_ascii=False) + "\n")
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            pass  # The reader reports the exit.
+
+    def close(self) -> None:
+        if self.process is None:
+            return
+        if self.alive():
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
@@ -0,0 +1,227 @@
+"""
+Streaming reader for the pipe delimited vocabulary files in cherokee-vocab-data.
+
+Each line is parsed in a single pass into a VocabEntry, with the Cherokee and English normalization done by
+precompiled patterns and ordered rule tables. Entries are yielded as they are read, so large sources never
+have to be held in memory as text.
+"""
+from __future__ import annotations
+
+import dataclasses
+import re
+import unicodedata
+from collections.abc import Iterator
+from typing import TextIO
+
+# Bump when the entries read, or the cards load_main_deck makes from them, change. Saved parsed decks are then
+# ignored and the vocabulary is parsed again.
+PARSER_VERSION: int = 1
+
+IX_ALT_PRONOUNCE: int = 2
+IX_PRONOUN: int = 3
+IX_VERB: int = 4
+IX_GENDER: int = 5
+IX_SYLLABARY: int = 6
+IX_PRONOUNCE: int = 7
+IX_ENGLISH: int = 8
+IX_INTRO_NOTE: int = 9
+IX_END_NOTE: int = 10
+IX_APP_FILE: int = 11
+
+UNDERDOT: str = "\u0323"
+
+GLOTTAL_STOPS: re.Pattern = re.compile("(?i)[ˀɁɂ]")
+LETTER: re.Pattern = re.compile("(?i)[a-z]")
+TONES_AND_UNDERDOT: re.Pattern = re.compile("[¹²³⁴" + UNDERDOT + "]")
+PUNCTUATION: re.Pattern = re.compile("(?i)[.,!?;]")
+WHITESPACE: re.Pattern = re.compile("\\s+")
+
+
+@dataclasses.dataclass(slots=True)
+class RewriteRule:
+    """Steps applied in order when the text has `when` (a substring or pattern) and does not have `unless`."""
+    steps: list[tuple[str | re.Pattern, str]] = dataclasses.field(default_factory=list)
+    when: str | re.Pattern | None = None
+    unless: str | None = None
+
+    def applies(self, text: str) -> bool:
+        if self.unless is not None and self.unless in text:
+            return False
+        if self.when is None:
+            return True
+        if isinstance(self.when, str):
+            return self.when in text
+        return self.when.search(text) is not None
+
+    def apply(self, text: str) -> str:
+        for old, new in self.steps:
+            if isinstance(old, str):
+                text = text.replace(old, new)
+            else:
+                text = old.sub(new, text)
+        return text
+
+
+def rewrite(text: str, rules: list[RewriteRule]) -> str:
+    for rule in rules:
+        if rule.applies(text):
+            text = rule.apply(text)
+    return text
+
+
+ENGLISH_RULES: list[RewriteRule] = [
+    RewriteRule([("v.t.", ""), ("v.i.", "")], "v."),
+    RewriteRule([("1.", ""), ("2.", ". Or, "), ("3.", ". Or, "), ("4.", ". Or, ")], "1."),
+    RewriteRule([(" (1)", ""), (" (one)", ""), (" (animate)", ", living, "), (" (inanimate)", ", non-living, ")],
+                "("),
+    RewriteRule([("/", ", or, ")], "/"),
+    RewriteRule([(re.compile("(?i)(he), it\\b"), "\\1, or, it")], re.compile("(?i)\\bhe, it\\b")),
+    RewriteRule([(re.compile("(?i)(him), it\\b"), "\\1, or, it")], re.compile("(?i)\\bhim, it\\b")),
+    RewriteRule([(re.compile("(?i)(she), it\\b"), "\\1, or, it")], re.compile("(?i)\\bshe, it\\b")),
+    RewriteRule([(re.compile("(?i)(her), it\\b"), "\\1, or, it")], re.compile("(?i)\\bher, it\\b")),
+    RewriteRule([("he's", "he is"), ("she's", "she is"), ("it's", "it is"), ("He's", "He is"), ("She's", "She is"),
+                 ("It's", "It is")], "'s"),
+    RewriteRule([("'re", " are")], "'re"),
+]
+
+SEX_GENDER_RULES: list[RewriteRule] = [
+    RewriteRule([(re.compile("(?i)(He )"), "\\1 or she "), (re.compile("\\bhimself"), "themself")], "himself"),
+    RewriteRule([(re.compile("(?i)\\b(He )"), "\\1or she "), (re.compile("\\bHimself"), "Themself")], "Himself"),
+    RewriteRule([(re.compile("(?i)\\b(His)"), "\\1 or her")], re.compile(".*\\b[Hh]is\\b.*")),
+    RewriteRule([(re.compile("(?i)\\b(He )"), "\\1or she ")], unless=" or she"),
+    RewriteRule([(re.compile("(?i)( him)"), "\\1 or her")], unless=" or her"),
+    RewriteRule([(re.compile("(?i)x(he|she|him|her|his)"), "\\1")]),
+]
+
+
+def fix_english_sex_genders(text_en: str) -> str:
+    tmp: str = WHITESPACE.sub(" ", text_en).strip()
+    lower: str = tmp.lower()
+    if "brother" in lower or "sister" in lower:
+        return text_en
+    return rewrite(tmp, SEX_GENDER_RULES)
+
+
+def end_sentence(text: str) -> str:
+    return text if text[-1] in ",.?!" else text + "."
+
+
+@dataclasses.dataclass(slots=True)
+class VocabEntry:
+    line_no: int = 0
+    skip_as_new: bool = False
+    bound_pronoun: str = ""
+    verb_stem: str = ""
+    gender: str = ""
+    syllabary: str = ""
+    challenge: str = ""
+    challenge_alts: list[str] = dataclasses.field(default_factory=list)  # From the pronunciation field.
+    alt_pronounce: str = ""  # The alternate pronunciation field as is.
+    alt_pronunciations: list[str] = dataclasses.field(default_factory=list)  # From the alternate field.
+    check_text: str = ""  # The challenge without punctuation, for duplicate checks.
+    answer: str = ""
+    intro_note: str = ""
+    end_note: str = ""
+
+
+@dataclasses.dataclass(slots=True)
+class VocabReader:
+    """
+    Yields an entry per vocabulary line. Lines without Cherokee or English text are skipped with a warning,
+    and a duplicate pronunciation raises an exception.
+    """
+    source_file: str = ""
+
+    def __iter__(self) -> Iterator[VocabEntry]:
+        with open(self.source_file, "r") as r:
+            yield from self.read(r)
+
+    def read(self, r: TextIO) -> Iterator[VocabEntry]:
+        dupe_pronunciation_check: set[str] = set()
+        dupe_end_note_check: set[str] = set()
+        line_no: int = 0
+        for line in r:
+            # skip header line
+            if not line_no:
+                line_no = 1
+                continue
+            line_no += 1
+            line = unicodedata.normalize("NFC", line).strip()
+            # skip comments and blank lines
+            if line.startswith("#") or not line:
+                continue
+            entry: VocabEntry | None = self.parse(line, line_no, dupe_pronunciation_check)
+            if entry is None:
+                continue
+            if entry.end_note:
+                if entry.end_note in dupe_end_note_check:
+                    print(f"- WARN DUPLICATE END NOTE: ({line_no:,}) {entry.end_note}\n{line.split('|')}")
+                dupe_end_note_check.add(entry.end_note)
+            yield entry
+
+    @staticmethod
+    def parse(line: str, line_no: int, dupe_pronunciation_check: set[str]) -> VocabEntry | None:
+        fields: list[str] = line.split("|")
+        if len(fields) > IX_APP_FILE + 1 or len(fields) < IX_APP_FILE:
+            print(f"; {line}")
+            raise Exception(f"[Line {line_no:,}] Wrong field count of {len(fields)}."
+                            f" Should be {IX_APP_FILE + 1}.")
+        entry: VocabEntry = VocabEntry(line_no)
+        entry.skip_as_new = "*" in fields[0]
+        entry.verb_stem = unicodedata.normalize("NFC", TONES_AND_UNDERDOT.sub(
+                "", unicodedata.normalize("NFD", fields[IX_VERB])))
+        entry.bound_pronoun = unicodedata.normalize("NFC", TONES_AND_UNDERDOT.sub(
+                "", unicodedata.normalize("NFD", fields[IX_PRONOUN])))
+
+        cherokee_text: str = GLOTTAL_STOPS.sub("ʔ", fields[IX_PRONOUNCE].strip())
+        if not LETTER.search(unicodedata.normalize("NFD", cherokee_text)):
+            print(f"Warning - no Cherokee text: {line}")
+            return None
+        if ";" in cherokee_text:
+            for text in cherokee_text.split(";"):
+                text = text.strip()
+                if not text:
+                    continue
+                text = end_sentence(text)
+                if text not in entry.challenge_alts:
+                    entry.challenge_alts.append(text[0].upper() + text[1:])
+            cherokee_text = cherokee_text[0:cherokee_text.index(";")].strip()
+        cherokee_text = end_sentence(cherokee_text)
+        entry.challenge = cherokee_text[0].upper() + cherokee_text[1:]
+
+        entry.check_text = PUNCTUATION.sub("", entry.challenge).strip()
+        if entry.check_text in dupe_pronunciation_check:
+            print(f"[Line {line_no:,}] Duplicate pronunciation: {entry.check_text}\n{fields}")
+            raise Exception(f"[Line {line_no:,}] Duplicate pronunciation: {entry.check_text}\n{fields}")
+        dupe_pronunciation_check.add(entry.check_text)
+
+        gender: str = fields[IX_GENDER].strip()
+        if gender:
+            gender = gender.lower()[0]
+            if gender != "m" and gender != "f":
+                print(f"BAD GENDER: {fields}")
+                gender = ""
+        entry.gender = gender
+
+        english_text: str = fields[IX_ENGLISH].strip()
+        if not LETTER.search(unicodedata.normalize("NFD", english_text)):
+            print(f"Warning - no English text: {line}")
+            return None
+        english_text = " Or. ".join(end_sentence(text.strip()) for text in english_text.split(";"))
+        english_text = rewrite(english_text, ENGLISH_RULES)
+        english_text = english_text[0].upper() + english_text[1:]
+        entry.answer = fix_english_sex_genders(english_text)
+
+        if len(fields) > IX_INTRO_NOTE:
+            entry.intro_note = fields[IX_INTRO_NOTE].strip()
+        if len(fields) > IX_END_NOTE:
+            entry.end_note = fields[IX_END_NOTE].strip()
+
+        entry.alt_pronounce = fields[IX_ALT_PRONOUNCE]
+        for alt in entry.alt_pronounce.split(";"):
+            alt = alt.strip()
+            if not alt:
+                continue
+            entry.alt_pronunciations.append(GLOTTAL_STOPS.sub("ʔ", end_sentence(alt)))
+        entry.syllabary = fields[IX_SYLLABARY]
+        return entry
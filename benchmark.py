@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the expensive stages of the lesson pipeline against a synthetic vocabulary and fake clips.
+
+Everything runs in a scratch directory. Nothing is synthesized: every clip the run needs is written to the
+cache up front as a placeholder MP3 with a normalized PCM sidecar, and Amazon Polly and IMS-Toucan are
+disabled. MP3 export is skipped when ffmpeg is not installed.
+
+    ./benchmark.py --cards 1000 --sessions 10 --report benchmark.json
+
+The results are written as JSON so runs can be compared over time.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import math
+import os
+import pathlib
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from array import array
+from collections.abc import Callable
+from datetime import datetime
+from random import Random
+
+import simplejson
+from pydub import AudioSegment
+
+import DeckFile
+import LeitnerAudioDeck as Leitner
+import Prompts  # Imports tts, which imports main.
+import main
+import tts
+from ClipCache import ClipCache
+from LeitnerAudioDeck import AudioCard
+from LeitnerAudioDeck import LeitnerAudioDeck
+from LeitnerAudioDeck import LeitnerQueueDeck
+from ReviewSheet import export_review_sheets
+from SessionPlan import SessionPlan
+from SessionTimeline import SessionTimeline
+from config import Config
+
+BENCHMARK_VERSION: int = 1
+HERE: pathlib.Path = pathlib.Path(__file__).resolve().parent
+
+SYLLABLES: list[str] = ["a", "e", "i", "o", "u", "v", "ga", "ka", "ge", "gi", "go", "gu", "gv", "ha", "he", "hi",
+                        "ho", "hu", "la", "le", "li", "lo", "lu", "ma", "me", "mi", "mo", "na", "ne", "ni", "no",
+                        "nu", "nv", "kwa", "kwe", "kwi", "sa", "se", "si", "so", "su", "da", "de", "di", "do", "du",
+                        "dla", "tla", "tli", "tsa", "tse", "tsi", "tso", "tsu", "wa", "we", "wi", "wo", "ya", "ye",
+                        "yi", "yo", "yu"]
+TONES: list[str] = ["", "", "́", "̀", "̂", "̌"]
+PRONOUNS: list[str] = ["ga", "ji", "hi", "a", "ogi", "osdi", "ini", "sdi", "idi", "i", "ani", "uni"]
+ENGLISH: list[str] = ["he is walking", "she is eating it", "he, it is sitting", "I am seeing him",
+                      "they are singing", "you are cooking it", "it's raining", "we are going (animate)",
+                      "he is hunting (inanimate)", "she is his sister", "you both are writing it", "we all are"]
+TONE_HZ: list[int] = [220, 330, 440, 550]
+
+
+def write_vocab(vocab_file: str, cards: int, rand: Random) -> None:
+    """Writes a vocabulary file with the fields load_main_deck reads, one unique pronunciation per line."""
+    seen: set[str] = set()
+    with open(vocab_file, "w") as w:
+        w.write("id|x|alt|pronoun|verb|gender|syllabary|pronounce|english|intro|end_note|app_file\n")
+        ix: int = 0
+        while ix < cards:
+            words: list[str] = list()
+            for _ in range(rand.randint(1, 3)):
+                word: str = "".join(rand.choice(SYLLABLES) + rand.choice(TONES)
+                                    for _ in range(rand.randint(2, 5)))
+                words.append(word)
+            pronounce: str = " ".join(words)
+            if pronounce in seen:
+                continue
+            seen.add(pronounce)
+            ix += 1
+            alt: str = ""
+            if ix % 7 == 0:
+                alt = pronounce.replace("́", "")
+            if ix % 11 == 0:
+                pronounce += "; " + " ".join(reversed(words))
+            english: str = f"{rand.choice(ENGLISH)} {ix}"
+            if ix % 13 == 0:
+                english += f"; {rand.choice(ENGLISH)}"
+            fields: list[str] = [str(ix) if ix % 17 else f"{ix}*", "", alt, rand.choice(PRONOUNS),
+                                 rand.choice(SYLLABLES) + rand.choice(SYLLABLES), rand.choice(["", "", "m", "f"]),
+                                 "", pronounce, english, "", f"Read chapter {ix // 50}." if ix % 50 == 0 else "",
+                                 ""]
+            w.write("|".join(fields) + "\n")
+
+
+def clip_files(deck: LeitnerAudioDeck, alpha: float, prompts: Prompts.PromptLibrary, sessions: int) -> set[str]:
+    """The cache file of every Cherokee, English, and prompt clip a run over the deck uses."""
+    files: set[str] = set()
+    for card in deck:
+        if card.data.end_note:
+            files.add(tts.get_mp3_en(Prompts.AMZ_VOICE_INSTRUCTOR, card.data.end_note))
+        for text in [card.data.challenge, *card.data.challenge_alts]:
+            for voice in main.IMS_VOICES:
+                files.add(tts.get_mp3_chr(voice, text, alpha))
+        for voice in main.AMZ_VOICES:
+            files.add(tts.get_mp3_en(voice, card.data.answer))
+    for tag in prompts:
+        files.add(tts.get_mp3_en(prompts.voice, prompts.text(tag)))
+    for session in range(sessions):
+        files.add(tts.get_mp3_en(Prompts.AMZ_VOICE_INSTRUCTOR, f"Day {session + 1}."))
+    return files
+
+
+def write_fake_clips(files: set[str]) -> int:
+    """Writes a placeholder MP3 and a tone of 0.4 to 2.5 seconds as its sidecar for each file. Returns the frames."""
+    tones: list[bytes] = list()
+    for hz in TONE_HZ:
+        samples: array = array("h", (int(8_000 * math.sin(2 * math.pi * hz * ix / main.LESSON_HZ))
+                                     for ix in range(main.LESSON_HZ * 5 // 2)))
+        tones.append(samples.tobytes())
+    total: int = 0
+    for file in sorted(files):
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        with open(file, "wb") as w:
+            w.write(b"fake mp3 " + file.encode("UTF-8"))
+        h: int = int(hashlib.sha1(file.encode("UTF-8")).hexdigest(), 16)
+        frames: int = main.LESSON_HZ * 2 // 5 + h % (main.LESSON_HZ * 21 // 10)
+        audio: AudioSegment = AudioSegment(data=tones[h % len(tones)][:frames * 2], sample_width=2,
+                                           frame_rate=main.LESSON_HZ, channels=1)
+        tts.write_pcm(tts.get_pcm_file(file), os.stat(file), audio)
+        total += frames
+    return total
+
+
+def no_polly():
+    raise RuntimeError("The benchmark never calls Amazon Polly. A clip is missing from the fake cache.")
+
+
+def timed(results: dict, stage: str, fn: Callable[[], dict | None]) -> None:
+    """Runs the stage with its output hidden and records its wall time with any figures it returns."""
+    print(f"{stage} ...", end=" ", flush=True)
+    start: float = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        figures: dict | None = fn()
+    seconds: float = time.perf_counter() - start
+    results[stage] = {"seconds": round(seconds, 4), **(figures or dict())}
+    print(f"{seconds:,.3f}s")
+
+
+def deck_moves(cards: list[AudioCard], moves: int, rand: Random) -> dict:
+    """
+    Moves the cards between decks of both kinds, taking each from wherever it is. Every hundred moves a card is
+    inserted at the top and cards are deleted by index and by slice, and slice assignment must be refused.
+    """
+    decks: list[LeitnerAudioDeck | LeitnerQueueDeck] = [LeitnerAudioDeck(), LeitnerAudioDeck(), LeitnerQueueDeck()]
+    for card in cards:
+        decks[0].append(card)
+    for ix in range(moves):
+        deck: LeitnerAudioDeck | LeitnerQueueDeck = decks[ix % len(decks)]
+        deck.append(rand.choice(cards))
+        if ix % 100 or len(deck) < 4:
+            continue
+        deck.insert(0, rand.choice(cards))
+        del deck[len(deck) // 2]
+        del deck[1:3]
+        try:
+            deck[0:1] = [rand.choice(cards)]
+        except TypeError:
+            pass
+        else:
+            raise RuntimeError(f"{type(deck).__name__} accepted a slice assignment.")
+    for deck in decks:
+        deck.verify()
+    in_decks: int = sum(1 for card in cards if card.my_deck is not None)
+    if in_decks != sum(len(deck) for deck in decks):
+        raise RuntimeError(f"{in_decks:,} cards are in decks holding {sum(len(deck) for deck in decks):,}.")
+    return {"cards": len(cards), "moves": moves}
+
+
+def reset_scheduler(cfg: Config, deck: LeitnerAudioDeck) -> None:
+    main.cfg = cfg
+    main.main_deck = deck
+    main.discards_deck = LeitnerAudioDeck()
+    main.finished_deck = LeitnerQueueDeck()
+    main.active_deck = LeitnerAudioDeck()
+    main.rand.seed(1234)
+    main.ims_voices.clear()
+    main.amz_voices.clear()
+    main.previous_voice = ""
+    main.amz_previous_voice = ""
+
+
+def run(args: argparse.Namespace, work_dir: str) -> dict:
+    results: dict = dict()
+    rand: Random = Random(args.seed)
+    cfg: Config = Config()
+    cfg.create_all_sessions = False
+    cfg.sessions_to_create = args.sessions
+    cfg.extra_sessions = 0
+    dataset: str = "bound-pronouns"  # Any dataset with a title prompt.
+    os.chdir(work_dir)
+    main.cfg = cfg
+    tts.polly_provider = no_polly
+    tts.toucan_worker_cmd = [os.path.join(work_dir, "no-toucan-worker")]
+
+    vocab_file: str = os.path.join(work_dir, "vocab.txt")
+    write_vocab(vocab_file, args.cards, rand)
+    deck: LeitnerAudioDeck | None = None
+
+    def load_main_deck() -> dict:
+        nonlocal deck
+        deck = main.load_main_deck(vocab_file)
+        return {"cards": len(deck)}
+
+    timed(results, "load_main_deck", load_main_deck)
+    results["load_main_deck"]["cards_per_second"] = round(len(deck) / results["load_main_deck"]["seconds"], 1)
+
+    def load_parsed_deck() -> dict:
+        return {"cards": len(main.load_parsed_deck(vocab_file))}
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        main.load_parsed_deck(vocab_file)  # Parses and saves the deck, so the timed load reads it back.
+    timed(results, "load_parsed_deck", load_parsed_deck)
+
+    prompts: Prompts.PromptLibrary = Prompts.create_prompts()
+    files: set[str] = clip_files(deck, cfg.alpha, prompts, args.sessions)
+    clip_frames: int = write_fake_clips(files)
+    results["fake_clips"] = {"clips": len(files), "audio_seconds": round(clip_frames / main.LESSON_HZ, 1)}
+
+    def create_card_audio() -> dict:
+        main.cfg = cfg
+        tts.load_cache_index()
+        main.create_card_audio(deck)
+        return {"clips": len(tts.cache_index)}
+
+    timed(results, "create_card_audio", create_card_audio)
+    cards: list[AudioCard] = list(deck)  # Scheduling moves the cards out of the deck.
+
+    timed(results, "deck_moves", lambda: deck_moves([AudioCard() for _ in cards], 100_000, Random(args.seed)))
+    stage: dict = results["deck_moves"]
+    stage["moves_per_second"] = round(stage["moves"] / stage["seconds"], 1)
+    Leitner.check_invariants = True  # Every move checks both decks, so far fewer moves are made.
+    try:
+        timed(results, "deck_invariants", lambda: deck_moves([AudioCard() for _ in cards], 2_000, Random(args.seed)))
+    finally:
+        Leitner.check_invariants = False
+
+    calls: list[int] = [0]
+    next_card: Callable = main.next_card
+
+    def counted_next_card(exercise_set: int, prev_card_id: str) -> AudioCard | None:
+        calls[0] += 1
+        return next_card(exercise_set, prev_card_id)
+
+    plans: list[SessionPlan] = list()
+
+    def plan_sessions() -> dict:
+        reset_scheduler(cfg, deck)
+        main.next_card = counted_next_card
+        try:
+            plans.extend(main.plan_sessions(dataset, prompts))
+        finally:
+            main.next_card = next_card
+        return {"sessions": len(plans), "next_card_calls": calls[0],
+                "audio_seconds": round(sum(plan.duration_seconds for plan in plans), 1)}
+
+    timed(results, "plan_sessions", plan_sessions)
+    stage = results["plan_sessions"]
+    stage["next_card_calls_per_second"] = round(stage["next_card_calls"] / stage["seconds"], 1)
+
+    def render_timelines() -> dict:
+        tts.clip_cache = ClipCache(tts.clip_cache.max_bytes)  # Every clip is read from its sidecar.
+        size: int = 0
+        for plan in plans:
+            timeline: SessionTimeline = SessionTimeline.from_dict(plan.timeline, tts.load_audio)
+            for chunk in timeline.iter_raw():
+                size += len(chunk)
+        return {"sessions": len(plans), "bytes": size}
+
+    timed(results, "render_timelines", render_timelines)
+    stage = results["render_timelines"]
+    stage["audio_seconds_per_second"] = round(results["plan_sessions"]["audio_seconds"] / stage["seconds"], 1)
+
+    if shutil.which(AudioSegment.converter) and plans:
+        def export_mp3() -> dict:
+            timeline: SessionTimeline = SessionTimeline.from_dict(plans[0].timeline, tts.load_audio)
+            output_mp3: str = os.path.join(work_dir, "session.mp3")
+            timeline.export(output_mp3, format="mp3", frame_rate=main.MP3_HZ,
+                            parameters=["-qscale:a", str(main.MP3_QUALITY)], tags={"title": "Benchmark"})
+            return {"audio_seconds": round(timeline.duration_seconds, 1), "bytes": os.path.getsize(output_mp3)}
+
+        timed(results, "export_mp3", export_mp3)
+        stage = results["export_mp3"]
+        stage["audio_seconds_per_second"] = round(stage["audio_seconds"] / stage["seconds"], 1)
+    else:
+        results["export_mp3"] = {"skipped": "ffmpeg not found"}
+
+    deck_file: pathlib.Path = pathlib.Path(work_dir, "decks", "benchmark.json")
+
+    def save_deck() -> dict:
+        DeckFile.save_deck(cards, deck_file)
+        return {"cards": len(cards), "bytes": deck_file.stat().st_size}
+
+    def load_review_deck() -> dict:
+        return {"cards": len(main.load_review_deck(deck_file))}
+
+    def review_sheets() -> dict:
+        sheets: list[pathlib.Path] = export_review_sheets(cards, work_dir, dataset, "tsv")
+        return {"cards": len(cards), "bytes": sum(sheet.stat().st_size for sheet in sheets)}
+
+    timed(results, "export_review_sheets", review_sheets)
+    timed(results, "save_deck", save_deck)
+    timed(results, "load_review_deck", load_review_deck)
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main_benchmark() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Benchmark the lesson pipeline.")
+    parser.add_argument("--cards", type=int, default=1_000, help="Vocabulary lines in the synthetic deck.")
+    parser.add_argument("--sessions", type=int, default=10, help="Sessions to schedule and render.")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--report", type=pathlib.Path, default=None, help="""
+    JSON file for the results. They are printed when not given.
+    """)
+    parser.add_argument("--work-dir", type=pathlib.Path, default=None, help="""
+    Scratch directory, kept after the run. A temporary directory is used and removed when not given.
+    """)
+    args: argparse.Namespace = parser.parse_args()
+    report_file: pathlib.Path | None = args.report.resolve() if args.report else None
+    work_dir: str = str(args.work_dir.resolve()) if args.work_dir else tempfile.mkdtemp(prefix="audio-lessons-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    cwd: str = os.getcwd()
+    try:
+        results: dict = run(args, work_dir)
+    finally:
+        os.chdir(cwd)
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    report: dict = {"benchmark_version": BENCHMARK_VERSION, "time": datetime.now().isoformat(timespec="seconds"),
+                    "revision": git_revision(), "python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count(), "parameters": {"cards": args.cards, "sessions": args.sessions,
+                                                           "seed": args.seed},
+                    "results": results}
+    text: str = simplejson.dumps(report, indent=2, ensure_ascii=False)
+    if report_file:
+        with open(report_file, "w") as w:
+            w.write(text + "\n")
+        print(f"Results written to {report_file}.")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -11,6 +11,8 @@ import unicodedata
 from builtins import dict
 from builtins import list
 from builtins import str
+from collections.abc import Callable
+from collections.abc import Iterable
 
 
 def char_range(c1, c2):
@@ -104,30 +106,56 @@ for key in [*translit2syl.keys()]:
         translit2syl["ak"+key] = "ꭰꭹ" + translit2syl[key]
 
 
-translit_lookup: list[str] = [*translit2syl.keys()]
-translit_lookup.sort(key=lambda key: len(key), reverse=True)
+def compile_translit(table: dict[str, str]) -> dict:
+    """
+    Builds a prefix trie of the transliteration keys. Each node maps the next letter to its child node, and
+    the empty string to the syllabary for the key ending at that node.
+    """
+    trie: dict = dict()
+    for lookup, syllabary in table.items():
+        node: dict = trie
+        for letter in lookup:
+            node = node.setdefault(letter, dict())
+        node[""] = syllabary
+    return trie
+
+
+translit_trie: dict = compile_translit(translit2syl)
+pronounce_strip: re.Pattern = re.compile("(?i)[^a-z\\s.,!?]")
 
 
 def pronounce2syllabary(text: str) -> str:
+    """Converts the pronunciation to syllabary in one pass, taking the longest transliteration key at each letter."""
     text = text.lower().strip()
-    text = re.sub("(?i)[^a-z\\s.,!?]", "", unicodedata.normalize("NFD", text))
-    tmp_syl = ""
-    while text:
-        changed: bool = False
-        for lookup in translit_lookup:
-            if text.startswith(lookup):
-                tmp_syl += translit2syl[lookup]
-                text = text[len(lookup):]
-                changed = True
+    text = pronounce_strip.sub("", unicodedata.normalize("NFD", text))
+    syllables: list[str] = list()
+    size: int = len(text)
+    ix: int = 0
+    while ix < size:
+        node: dict | None = translit_trie
+        match: str = ""
+        match_end: int = -1
+        end: int = ix
+        while end < size:
+            node = node.get(text[end])
+            if node is None:
                 break
-        if not changed:
-            letter = text[0]
-            text = text[1:]
-            if letter == "l":
-                tmp_syl += "ꮅ"
-            else:
-                tmp_syl += letter
-    return unicodedata.normalize("NFC", tmp_syl)
+            end += 1
+            if "" in node:
+                match = node[""]
+                match_end = end
+        if match_end < 0:
+            letter: str = text[ix]
+            syllables.append("ꮅ" if letter == "l" else letter)
+            ix += 1
+        else:
+            syllables.append(match)
+            ix = match_end
+    return unicodedata.normalize("NFC", "".join(syllables))
+
+
+def pronounce2syllabary_batch(texts: Iterable[str]) -> list[str]:
+    return convert_batch(texts, pronounce2syllabary)
 
 
 rrd_fix_lookup:dict [str, str] = dict()
@@ -181,50 +209,78 @@ def test():
     print()
 
 
-def ced2mco(text: str):
-    import unicodedata as ud
-    import re
+GLOTTAL_STOPS: re.Pattern = re.compile("[\u02c0\u0241\u0242]")
+ASCII_CED: list[tuple[str, str]] = [(".", "\u0323"), ("1", "¹"), ("2", "²"), ("3", "³"), ("4", "⁴"), ("?", "ʔ")]
+TONES2MCO: list[tuple[str, str]] = [("²³", "\u030C"), ("³²", "\u0302"), ("¹", "\u0300"), ("²", ""), ("³", "\u0301"),
+                                    ("⁴", "\u030b")]
+
+# ced2mco steps, in order.
+CED_UNDERDOT_VOWELS: re.Pattern = re.compile("(?i)([aeiouv])([^¹²³⁴\u0323]+)")
+CED_UNDERDOT_FINAL: re.Pattern = re.compile("(?i)([aeiouv])([¹²³⁴]+)$")
+CED_UNDERDOT_BEFORE: re.Pattern = re.compile("(?i)([aeiouv])([¹²³⁴]+)([^¹²³⁴a-zʔ])")
+CED_TONES_FIRST: re.Pattern = re.compile("(?i)([^aeiouv\u0323¹²³⁴]+)([¹²³⁴]+)")
+CED_LONG_VOWELS: re.Pattern = re.compile("(?i)([aeiouv])([¹²³⁴]+)")
+CED_LOW_FINAL: re.Pattern = re.compile("(?i)([aeiouv])²$")
+CED_LOW_BEFORE: re.Pattern = re.compile("(?i)([aeiouv])²([^a-zʔ¹²³⁴:])")
+
+CED_TONE: re.Pattern = re.compile("[¹²³⁴]")
 
-    tones2mco = [("²³", "\u030C"), ("³²", "\u0302"), ("¹", "\u0300"), ("²", ""), ("³", "\u0301"), ("⁴", "\u030b")]
+RRD_SHORT_UNDERDOT: re.Pattern = re.compile("(?i)([aeiouv]\u0323)([^\\s¹²³⁴])")
+RRD_SHORT: re.Pattern = re.compile("(?i)([aeiouv])([^\\s\u0323¹²³⁴])")
 
-    text = ud.normalize('NFD', text)
+
+def ced2mco(text: str):
+    text = unicodedata.normalize('NFD', text)
 
     # ensure consistent handling of glottal stop variations
-    text = re.sub("[\u02c0\u0241\u0242]", "\u0294", text)
+    text = GLOTTAL_STOPS.sub("\u0294", text)
 
-    text = re.sub("(?i)([aeiouv])([^¹²³⁴\u0323]+)", "\\1\u0323\\2", text)
-    text = re.sub("(?i)([aeiouv])([¹²³⁴]+)$", "\\1\u0323\\2", text)
-    text = re.sub("(?i)([aeiouv])([¹²³⁴]+)([^¹²³⁴a-zʔ])", "\\1\u0323\\2\\3", text)
-    text = re.sub("(?i)([^aeiouv\u0323¹²³⁴]+)([¹²³⁴]+)", "\\2\\1", text)
-    text = re.sub("(?i)([aeiouv])([¹²³⁴]+)", "\\1\\2:", text)
+    # Without tone numbers, the steps below only drop the underdots.
+    if not CED_TONE.search(text):
+        return unicodedata.normalize('NFC', text.replace("\u0323", ""))
+
+    text = CED_UNDERDOT_VOWELS.sub("\\1\u0323\\2", text)
+    text = CED_UNDERDOT_FINAL.sub("\\1\u0323\\2", text)
+    text = CED_UNDERDOT_BEFORE.sub("\\1\u0323\\2\\3", text)
+    text = CED_TONES_FIRST.sub("\\2\\1", text)
+    text = CED_LONG_VOWELS.sub("\\1\\2:", text)
     text = text.replace("\u0323", "")
-    text = re.sub("(?i)([aeiouv])²$", "\\1\u0304", text)
-    text = re.sub("(?i)([aeiouv])²([^a-zʔ¹²³⁴:])", "\\1\u0304\\2", text)
-    for ced2mcotone in tones2mco:
+    text = CED_LOW_FINAL.sub("\\1\u0304", text)
+    text = CED_LOW_BEFORE.sub("\\1\u0304\\2", text)
+    for ced2mcotone in TONES2MCO:
         text = text.replace(ced2mcotone[0], ced2mcotone[1])
 
-    return ud.normalize('NFC', text)
+    return unicodedata.normalize('NFC', text)
 
 
 def ascii_ced2mco(text: str):
-    import unicodedata as ud
-    text = ud.normalize('NFD', text)
-    text = text.replace(".", "\u0323")
-    text = text.replace("1", "¹")
-    text = text.replace("2", "²")
-    text = text.replace("3", "³")
-    text = text.replace("4", "⁴")
-    text = text.replace("?", "ʔ")
+    text = unicodedata.normalize('NFD', text)
+    for ascii_ced, ced in ASCII_CED:
+        text = text.replace(ascii_ced, ced)
     return ced2mco(text)
 
 
 def rrd2mco(text: str):
-    import unicodedata as ud
-    text: str = ud.normalize('NFD', text)
-    text = re.sub("(?i)([aeiouv]\u0323)([^\\s¹²³⁴])", "\\1²\\2", text)
-    text = re.sub("(?i)([aeiouv])([^\\s\u0323¹²³⁴])", "\\1²\\2", text)
+    text: str = unicodedata.normalize('NFD', text)
+    text = RRD_SHORT_UNDERDOT.sub("\\1²\\2", text)
+    text = RRD_SHORT.sub("\\1²\\2", text)
     return ced2mco(text)
 
 
+def convert_batch(texts: Iterable[str], convert: Callable[[str], str]) -> list[str]:
+    """Converts a column of texts, converting each distinct text once."""
+    converted: dict[str, str] = dict()
+    results: list[str] = list()
+    for text in texts:
+        if text not in converted:
+            converted[text] = convert(text)
+        results.append(converted[text])
+    return results
+
+
+def ced2mco_batch(texts: Iterable[str]) -> list[str]:
+    return convert_batch(texts, ced2mco)
+
+
 if __name__ == "__main__":
     test()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import pathlib
 from dataclasses import dataclass
+from dataclasses import field
 from typing import Optional
 from typing import TextIO
 
@@ -46,6 +47,19 @@ class Config:
 
     alpha: float = 1.3  # Duration multiplier. Lower = faster speaking, Higher - slower speaking.
 
+    clip_cache_mb: int = 1024  # Memory limit for decoded audio clips kept for reuse between cards and sessions.
+
+    polly_threads: int = 4  # Concurrent Amazon Polly requests.
+    polly_max_rate: float = 8.0  # Amazon Polly requests started per second.
+    polly_retries: int = 5  # Retries, with backoff, of throttled or failed Amazon Polly requests.
+
+    tts_shards: int = 1  # Parallel IMS-Toucan processes for Cherokee batches.
+    tts_shard_threads: int = 0  # Inference threads per IMS-Toucan process. Zero divides the CPUs between them.
+    tts_shard_retries: int = 2  # Retries of a failed shard, skipping its finished clips.
+    # Command starting run_tts_worker.py with IMS-Toucan's Python, such as
+    # ["~/miniconda3/envs/toucan/bin/python", "run_tts_worker.py"]. Empty runs run_tts.py and run_tts_file.py.
+    tts_worker: list[str] = field(default_factory=list)
+
     @staticmethod
     def load(file: TextIO):
         return Config.from_json(file.read())
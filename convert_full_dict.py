@@ -11,6 +11,7 @@ import unicodedata
 from pathlib import Path
 import re
 from chrutils import ascii_ced2mco
+from chrutils import convert_batch
 from chrutils import rrd2mco
 
 
@@ -91,12 +92,13 @@ def main() -> None:
 
             text: str = ""
             item: str = ""
+            pron = [item.strip() for item in pron]
+            if source == "ced":
+                pron = convert_batch(pron, ascii_ced2mco)
+            if source == "rrd":
+                pron = convert_batch(pron, rrd2mco)
             for item in pron:
                 item = item.strip()
-                if source == "ced":
-                    item = ascii_ced2mco(item).strip()
-                if source == "rrd":
-                    item = rrd2mco(item).strip()
                 text += "|"
                 if item.startswith("-") or item.endswith("-"):
                     continue
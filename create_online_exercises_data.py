@@ -5,9 +5,9 @@ from typing import Dict, List, Optional
 import os
 import unicodedata
 
-import jsonpickle
 import simplejson
 
+import DeckFile
 from LeitnerAudioDeck import LeitnerAudioDeck
 from SrtEntry import SrtEntry
 from config import Config
@@ -78,11 +78,7 @@ def load_srts(srt_dir: Path) -> Dict[int, List[SrtEntry]]:
     return entries_by_exercise
 
 def load_deck(path: Path):
-    jsonpickle.load_backend('simplejson', 'dumps', 'loads', ValueError)
-    jsonpickle.set_preferred_backend('simplejson')
-    # jsonpickle.set_decoder_options('simplejson', ensure_ascii=False)
-    with open(path, "r") as r:
-        deck = jsonpickle.loads(r.read())
+    deck = DeckFile.load_deck(path)
 
     assert isinstance(deck,  LeitnerAudioDeck), "Deck should be a leitner audio deck"
 
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Stand-in for run_tts_worker.py that needs no model, for trying the worker path without IMS-Toucan.
+
+Each request gets a short tone written as a WAV file to its mp3 path, which ffmpeg decodes by content.
+Requests with the --fail text in them are answered with an error.
+
+    tts.toucan_worker_cmd = ["./fake_tts_worker.py", "--delay", "0.1"]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import math
+import os
+import sys
+import time
+import wave
+from array import array
+from collections.abc import Callable
+
+from run_tts_worker import serve
+
+FAKE_HZ: int = 22_050
+
+
+def fake_synthesizer(delay: float, fail: str) -> Callable[[dict], None]:
+    def synthesize(request: dict) -> None:
+        if fail and fail in request["text"]:
+            raise ValueError(f"Failing as asked: {request['text']}")
+        time.sleep(delay)
+        h: int = int(hashlib.sha1(request["text"].encode("UTF-8")).hexdigest(), 16)
+        hz: int = 220 + h % 440
+        frames: int = FAKE_HZ // 2 + len(request["text"]) * FAKE_HZ // 20
+        samples: array = array("h", (int(8_000 * math.sin(2 * math.pi * hz * ix / FAKE_HZ)) for ix in range(frames)))
+        os.makedirs(os.path.dirname(request["mp3"]), exist_ok=True)
+        with wave.open(request["mp3"], "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(FAKE_HZ)
+            w.writeframes(samples.tobytes())
+
+    return synthesize
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Fake IMS-Toucan synthesis worker.")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to spend on each request.")
+    parser.add_argument("--fail", type=str, default="", help="Answer requests with this in the text with an error.")
+    args: argparse.Namespace = parser.parse_args()
+    serve(fake_synthesizer(args.delay, args.fail), sys.stdin, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,22 +10,25 @@ from __future__ import annotations
 from os.path import relpath
 import argparse
 import dataclasses
+import functools
+import hashlib
 import os
 import pathlib
 import random
-import re
 import shutil
 import subprocess
 import unicodedata
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
 from datetime import date
 from datetime import datetime
 from random import Random
 
-import jsonpickle
 import simplejson
-from pydub import AudioSegment
 from tqdm import tqdm
 
+import DeckFile
 import Prompts
 import tts
 from CardUtils import CardUtils
@@ -33,26 +36,29 @@ from LeitnerAudioDeck import AudioCard
 from LeitnerAudioDeck import AudioData
 from LeitnerAudioDeck import AudioDataFile
 from LeitnerAudioDeck import LeitnerAudioDeck
+from LeitnerAudioDeck import LeitnerQueueDeck
+from ReviewSheet import REVIEW_SHEET_FORMATS
+from ReviewSheet import export_review_sheets
+from SessionPlan import PlannedCard
+from SessionPlan import SessionPlan
+from SessionTimeline import SessionTimeline
 from SrtEntry import SrtEntry
+from VocabReader import PARSER_VERSION
+from VocabReader import VocabReader
 from config import Config
 
+try:
+    import cairosvg  # Needs the native cairo library, so Inkscape is kept as the fallback.
+except (ImportError, OSError):
+    cairosvg = None
+
 MP3_QUALITY: int = 3
 MP3_HZ: int = 48_000
 
-RESORT_BY_LENGTH: bool = False
-
-IX_ALT_PRONOUNCE: int = 2
-IX_PRONOUN: int = 3
-IX_VERB: int = 4
-IX_GENDER: int = 5
-IX_SYLLABARY: int = 6
-IX_PRONOUNCE: int = 7
-IX_ENGLISH: int = 8
-IX_INTRO_NOTE: int = 9
-IX_END_NOTE: int = 10
-IX_APP_FILE: int = 11
+RENDER_VERSION: int = 3  # Bump when render_session changes its output, so every session is rendered again.
+SVG_TEMPLATE: str = "cherokee-vocab-data/svg/title_template.svg"
 
-UNDERDOT: str = "\u0323"
+RESORT_BY_LENGTH: bool = False
 
 CACHE_CHR = os.path.join("cache", "chr")
 CACHE_EN = os.path.join("cache", "en")
@@ -89,6 +95,10 @@ class Options:
     dataset: str = ""
     mp4: bool | None = None
     only_assemble: bool = False
+    jobs: int = 1
+    plan_only: bool = False
+    rerender: bool = False
+    review_sheets: str = ""
 
 
 def parse_args() -> Options:
@@ -104,6 +114,19 @@ def parse_args() -> Options:
         Overrides value provided in dataset configuration file.
         """, default=None)
     parser.add_argument("--only-assemble", dest="only_assemble", action="store_const", const=True, default=False)
+    parser.add_argument("--jobs", dest="jobs", type=int, default=1, help="""
+    Number of worker processes used to render the planned sessions.
+    """)
+    parser.add_argument("--rerender", dest="rerender", action="store_const", const=True, default=False, help="""
+    Render every session, even those whose inputs match the render manifest of the previous run.
+    """)
+    parser.add_argument("--review-sheets", dest="review_sheets", type=str, choices=REVIEW_SHEET_FORMATS,
+                        default="", help="""
+    Also write the deck's vocabulary as review sheets, in both directions, in the given format.
+    """)
+    parser.add_argument("--plan-only", dest="plan_only", action="store_const", const=True, default=False, help="""
+    Only schedule the sessions, using the clip durations in the cache index. No audio is synthesized, decoded, or written.
+    """)
     args: argparse.Namespace = parser.parse_args()
     if args.mp4 is not None:
         options.mp4 = args.mp4
@@ -114,6 +137,10 @@ def parse_args() -> Options:
     if args.only_assemble:
         options.only_assemble = True
     options.dataset = args.dataset
+    options.jobs = max(1, args.jobs)
+    options.plan_only = args.plan_only
+    options.rerender = args.rerender
+    options.review_sheets = args.review_sheets
     return options
 
 
@@ -169,203 +196,78 @@ def next_amz_voice(gender: str = "") -> str:
     return voice
 
 
+def load_parsed_deck(source_file: str) -> LeitnerAudioDeck:
+    """
+    Loads the deck saved in decks/ when the vocabulary was last parsed, if the source file and the parser are
+    unchanged. Otherwise parses the source with load_main_deck and saves the result for the next run.
+    """
+    with open(source_file, "rb") as r:
+        source_sha1: str = hashlib.sha1(r.read()).hexdigest()
+    metadata: dict = {"source": os.path.basename(source_file), "source_sha1": source_sha1,
+                      "parser_version": PARSER_VERSION}
+    parsed_deck: pathlib.Path = pathlib.Path("decks", pathlib.Path(source_file).stem + "-parsed.json")
+    if parsed_deck.exists():
+        try:
+            if DeckFile.read_metadata(parsed_deck) == metadata:
+                print(f"Loading {parsed_deck}. {source_file} is unchanged.")
+                return DeckFile.load_deck(parsed_deck)
+        except (ValueError, KeyError, IndexError) as e:
+            print(f"Ignoring {parsed_deck}: {e}")
+    deck: LeitnerAudioDeck = load_main_deck(source_file)
+    DeckFile.save_deck(deck.cards, parsed_deck, metadata)
+    return deck
+
+
 def load_main_deck(source_file: str) -> LeitnerAudioDeck:
     chr2en_deck: LeitnerAudioDeck = LeitnerAudioDeck()
-    dupe_pronunciation_check: set[str] = set()
-    dupe_end_note_check: set[str] = set()
     cards_for_english_answers: dict[str, AudioCard] = dict()
 
-    line_no: int = 0
-    with open(source_file, "r") as r:
-        id_chr2en: int = 0
-        for line in r:
-            # skip header line
-            if not line_no:
-                line_no = 1
-                continue
-            line_no += 1
-            line = unicodedata.normalize("NFC", line).strip()
-            # skip comments and blank lines
-            if line.startswith("#") or not line:
-                continue
-            fields = line.split("|")
-            if len(fields) > IX_APP_FILE + 1 or len(fields) < IX_APP_FILE:
-                print(f"; {line}")
-                raise Exception(f"[Line {line_no:,}] Wrong field count of {len(fields)}."
-                                f" Should be {IX_APP_FILE + 1}.")
-            skip_as_new = "*" in fields[0]
-
-            verb_stem: str = unicodedata.normalize("NFD", fields[IX_VERB])
-            verb_stem = re.sub("[¹²³⁴" + UNDERDOT + "]", "", verb_stem)
-            verb_stem = unicodedata.normalize("NFC", verb_stem)
-
-            bound_pronoun: str = unicodedata.normalize("NFD", fields[IX_PRONOUN])
-            bound_pronoun = re.sub("[¹²³⁴" + UNDERDOT + "]", "", bound_pronoun)
-            bound_pronoun = unicodedata.normalize("NFC", bound_pronoun)
-
-            cherokee_text_alts: list[str] = list()
-            cherokee_text = fields[IX_PRONOUNCE].strip()
-            cherokee_text = re.sub("(?i)[ˀɁɂ]", "ʔ", cherokee_text)
-            if not re.sub("(?i)[^a-z]", "", unicodedata.normalize("NFD", cherokee_text)):
-                print(f"Warning - no Cherokee text: {line}")
-                continue
-
-            if ";" in cherokee_text:
-                for text in cherokee_text.split(";"):
-                    text = text.strip()
-                    if not text:
-                        continue
-                    if text[-1] not in ",.?!":
-                        text += "."
-                    if text and text not in cherokee_text_alts:
-                        cherokee_text_alts.append(text[0].upper()+text[1:])
-                cherokee_text = cherokee_text[0:cherokee_text.index(";")].strip()
-            if cherokee_text[-1] not in ",.?!":
-                cherokee_text += "."
-            cherokee_text = cherokee_text[0].upper() + cherokee_text[1:]
-
-            check_text = re.sub("(?i)[.,!?;]", "", cherokee_text).strip()
-            if check_text in dupe_pronunciation_check:
-                print(f"[Line {line_no:,}] Duplicate pronunciation: {check_text}\n{fields}")
-                raise Exception(f"[Line {line_no:,}] Duplicate pronunciation: {check_text}\n{fields}")
-            dupe_pronunciation_check.add(check_text)
-            gender: str = fields[IX_GENDER].strip()
-            if gender:
-                gender = gender.strip().lower()[0]
-                if gender.lower() != "m" and gender.lower() != "f":
-                    print(f"BAD GENDER: {fields}")
-                    gender = ""
-
-            english_text = fields[IX_ENGLISH].strip()
-            if not re.sub("(?i)[^a-z]", "", unicodedata.normalize("NFD", english_text)):
-                print(f"Warning - no English text: {line}")
-                continue
-            texts: list[str] = english_text.split(";")
-            if texts:
-                english_text = ""
-                for text in texts:
-                    text = text.strip()
-                    if text[-1] not in ",.?!":
-                        text += "."
-                    if english_text:
-                        english_text += " Or. "
-                    english_text += text
-            if "v.t." in english_text or "v.i." in english_text:
-                english_text = english_text.replace("v.t.", "").replace("v.i.", "")
-            if "1." in english_text:
-                english_text = english_text.replace("1.", "")
-                english_text = english_text.replace("2.", ". Or, ")
-                english_text = english_text.replace("3.", ". Or, ")
-                english_text = english_text.replace("4.", ". Or, ")
-            if "(" in english_text:
-                english_text = english_text.replace(" (1)", "")
-                english_text = english_text.replace(" (one)", "")
-                english_text = english_text.replace(" (animate)", ", living, ")
-                english_text = english_text.replace(" (inanimate)", ", non-living, ")
-            if "/" in english_text:
-                english_text = english_text.replace("/", ", or, ")
-
-            if re.search("(?i)\\bhe, it\\b", english_text):
-                english_text = re.sub("(?i)(he), it\\b", "\\1, or, it", english_text)
-            if re.search("(?i)\\bhim, it\\b", english_text):
-                english_text = re.sub("(?i)(him), it\\b", "\\1, or, it", english_text)
-            if re.search("(?i)\\bshe, it\\b", english_text):
-                english_text = re.sub("(?i)(she), it\\b", "\\1, or, it", english_text)
-            if re.search("(?i)\\bher, it\\b", english_text):
-                english_text = re.sub("(?i)(her), it\\b", "\\1, or, it", english_text)
-
-            if "'s" in english_text:
-                english_text = english_text.replace("he's", "he is")
-                english_text = english_text.replace("she's", "she is")
-                english_text = english_text.replace("it's", "it is")
-                english_text = english_text.replace("He's", "He is")
-                english_text = english_text.replace("She's", "She is")
-                english_text = english_text.replace("It's", "It is")
-            if "'re" in english_text:
-                english_text = english_text.replace("'re", " are")
-            english_text = english_text[0].upper() + english_text[1:]
-
-            english_text = fix_english_sex_genders(english_text)
-
-            to_en_card: AudioCard
-            to_en_data: AudioData
-
-            intro_note: str
-            if len(fields) > IX_INTRO_NOTE:
-                intro_note = fields[IX_INTRO_NOTE].strip()
-            else:
-                intro_note: str = ""
-
-            end_note: str
-            if len(fields) > IX_END_NOTE:
-                end_note = fields[IX_END_NOTE].strip()
-            else:
-                end_note: str = ""
-            if end_note:
-                if end_note in dupe_end_note_check:
-                    print(f"- WARN DUPLICATE END NOTE: ({line_no:,}) {end_note}\n{fields}")
-                dupe_end_note_check.add(end_note)
-
-            if check_text in cards_for_english_answers:
-                to_en_card = cards_for_english_answers[check_text]
-                to_en_data = to_en_card.data
-                old_answer: str = to_en_data.answer
-                to_en_data.answer += " Or, " + english_text
-                print(f"- {old_answer} => {to_en_data.answer}")
-                if intro_note:
-                    to_en_card.data.intro_note = intro_note
-                if end_note:
-                    to_en_card.data.end_note = end_note
-            else:
-                id_chr2en += 1
-
-                to_en_card = AudioCard()
-                to_en_data = AudioData()
-                to_en_card.data = to_en_data
-
-                to_en_data.bound_pronoun = bound_pronoun
-                to_en_data.verb_stem = verb_stem
-                to_en_data.answer = english_text
-                to_en_data.challenge = cherokee_text
-                to_en_data.card_id = id_chr2en
-                to_en_data.sex = gender
-                if intro_note:
-                    to_en_card.data.intro_note = intro_note
-                if end_note:
-                    to_en_card.data.end_note = end_note
-                if skip_as_new:
-                    to_en_data.bound_pronoun = "*"
-                    to_en_data.verb_stem = "*"
-                cards_for_english_answers[check_text] = to_en_card
-                syllabary: str = fields[IX_SYLLABARY]
-                to_en_data.sort_key = syllabary if syllabary else cherokee_text
-                chr2en_deck.append(to_en_card)
-
-            if fields[IX_ALT_PRONOUNCE] or cherokee_text_alts:
-                alts: list[str] = fields[IX_ALT_PRONOUNCE].split(";")
-                if cherokee_text not in to_en_data.challenge_alts:
-                    to_en_data.challenge_alts.append(cherokee_text)
-                for alt in alts:
-                    alt = alt.strip()
-                    if not alt:
-                        continue
-                    if alt[-1] not in ",.?!":
-                        alt += "."
-                    alt = re.sub("(?i)[ˀɁɂ]", "ʔ", alt)
-                    if not alt or alt in to_en_data.challenge_alts:
-                        continue
-                    to_en_data.challenge_alts.append(alt)
-                for alt in cherokee_text_alts:
-                    alt = alt.strip()
-                    if not alt:
-                        continue
-                    alt = re.sub("(?i)[ˀɁɂ]", "ʔ", alt)
-                    if not alt or alt in to_en_data.challenge_alts:
-                        continue
+    id_chr2en: int = 0
+    for entry in VocabReader(source_file):
+        to_en_card: AudioCard
+        to_en_data: AudioData
+        if entry.check_text in cards_for_english_answers:
+            to_en_card = cards_for_english_answers[entry.check_text]
+            to_en_data = to_en_card.data
+            old_answer: str = to_en_data.answer
+            to_en_data.answer += " Or, " + entry.answer
+            print(f"- {old_answer} => {to_en_data.answer}")
+            if entry.intro_note:
+                to_en_card.data.intro_note = entry.intro_note
+            if entry.end_note:
+                to_en_card.data.end_note = entry.end_note
+        else:
+            id_chr2en += 1
+
+            to_en_card = AudioCard()
+            to_en_data = AudioData()
+            to_en_card.data = to_en_data
+
+            to_en_data.bound_pronoun = entry.bound_pronoun
+            to_en_data.verb_stem = entry.verb_stem
+            to_en_data.answer = entry.answer
+            to_en_data.challenge = entry.challenge
+            to_en_data.card_id = id_chr2en
+            to_en_data.sex = entry.gender
+            if entry.intro_note:
+                to_en_card.data.intro_note = entry.intro_note
+            if entry.end_note:
+                to_en_card.data.end_note = entry.end_note
+            if entry.skip_as_new:
+                to_en_data.bound_pronoun = "*"
+                to_en_data.verb_stem = "*"
+            cards_for_english_answers[entry.check_text] = to_en_card
+            to_en_data.sort_key = entry.syllabary if entry.syllabary else entry.challenge
+            chr2en_deck.append(to_en_card)
+
+        if entry.alt_pronounce or entry.challenge_alts:
+            if entry.challenge not in to_en_data.challenge_alts:
+                to_en_data.challenge_alts.append(entry.challenge)
+            for alt in [*entry.alt_pronunciations, *entry.challenge_alts]:
+                if alt not in to_en_data.challenge_alts:
                     to_en_data.challenge_alts.append(alt)
-            syllabary: str = fields[IX_SYLLABARY]
-            if syllabary:
-                to_en_data.syllabary = syllabary
+        if entry.syllabary:
+            to_en_data.syllabary = entry.syllabary
 
     # Fix casing if needed.
     for to_en_card in chr2en_deck:
@@ -380,52 +282,9 @@ def load_main_deck(source_file: str) -> LeitnerAudioDeck:
             challenge = challenge[0].upper() + challenge[1:]
             to_en_data.challenge_alts.append(challenge)
 
-    review_sheet_chr2en: str = ""
-    review_sheet_en2chr: str = ""
-    for to_en_card in chr2en_deck:
-        to_en_data = to_en_card.data
-        review_sheet_chr2en += to_en_data.card_id
-        review_sheet_chr2en += "|"
-        review_sheet_chr2en += to_en_data.bound_pronoun
-        review_sheet_chr2en += "|"
-        review_sheet_chr2en += to_en_data.verb_stem
-        review_sheet_chr2en += "|"
-        review_sheet_chr2en += to_en_data.challenge
-        review_sheet_chr2en += "|"
-        review_sheet_chr2en += to_en_data.answer
-        review_sheet_chr2en += "\n"
-
-    with open("review-sheet-chr-en.txt", "w") as w:
-        w.write(review_sheet_chr2en)
-
-    with open("review-sheet-en-chr.txt", "w") as w:
-        w.write(review_sheet_en2chr)
-
     return chr2en_deck
 
 
-def fix_english_sex_genders(text_en) -> str:
-    tmp: str = re.sub("\\s+", " ", text_en).strip()
-    if "brother" in tmp.lower():
-        return text_en
-    if "sister" in tmp.lower():
-        return text_en
-    if "himself" in tmp:
-        tmp = re.sub("(?i)(He )", "\\1 or she ", tmp)
-        tmp = re.sub("\\bhimself", "themself", tmp)
-    if "Himself" in tmp:
-        tmp = re.sub("(?i)\\b(He )", "\\1or she ", tmp)
-        tmp = re.sub("\\bHimself", "Themself", tmp)
-    if re.search(".*\\b[Hh]is\\b.*", tmp):
-        tmp = re.sub("(?i)\\b(His)", "\\1 or her", tmp)
-    if " or she" not in tmp:
-        tmp = re.sub("(?i)\\b(He )", "\\1or she ", tmp)
-    if " or her" not in tmp:
-        tmp = re.sub("(?i)( him)", "\\1 or her", tmp)
-    tmp = re.sub("(?i)x(he|she|him|her|his)", "\\1", tmp)
-    return tmp
-
-
 def create_card_audio(deck: LeitnerAudioDeck):
     os.makedirs(CACHE_CHR, exist_ok=True)
     os.makedirs(CACHE_EN, exist_ok=True)
@@ -465,6 +324,7 @@ def create_card_audio(deck: LeitnerAudioDeck):
     tts.tts_chr_batch(entries, cfg.alpha)
 
     print("Creating English audio answers.")
+    entries = list()
     for card in tqdm(deck.cards):
         data: AudioData = card.data
         text_en = data.answer
@@ -474,7 +334,17 @@ def create_card_audio(deck: LeitnerAudioDeck):
             data_file.voice = voice
             data_file.pronunciation = text_en
             data.answer_files.append(data_file)
-            tts.tts_en(voice, text_en)
+            entries.append(tts.TTSBatchEntry(voice, text_en))
+    tts.tts_en_batch(entries)
+
+    print("Measuring audio durations.")
+    data_files: list[AudioDataFile] = list()
+    for card in deck.cards:
+        data_files.extend(card.data.challenge_files)
+        data_files.extend(card.data.answer_files)
+    durations: dict[str, float] = tts.clip_durations(sorted({data_file.file for data_file in data_files}))
+    for data_file in data_files:
+        data_file.duration = durations.get(data_file.file, 0.0)
 
 
 vstem_counts: dict[str, int] = dict()
@@ -516,33 +386,19 @@ def skip_new(card: AudioCard) -> bool:
 
 main_deck: LeitnerAudioDeck | None = None
 discards_deck: LeitnerAudioDeck | None = LeitnerAudioDeck()
-finished_deck: LeitnerAudioDeck | None = LeitnerAudioDeck()
+finished_deck: LeitnerQueueDeck | None = LeitnerQueueDeck()
 active_deck: LeitnerAudioDeck | None = LeitnerAudioDeck()
 max_review_cards_this_session: int = 0
 
 
-def save_deck(deck: LeitnerAudioDeck, destination: pathlib.Path):
-    jsonpickle.load_backend('simplejson', 'dumps', 'loads', ValueError)
-    jsonpickle.set_preferred_backend('simplejson')
-    jsonpickle.set_encoder_options('simplejson', ensure_ascii=False)
-
-    if not os.path.exists(destination.parent):
-        destination.parent.mkdir(exist_ok=True)
-    with open(destination, "w") as w:
-        w.write(jsonpickle.dumps(deck, indent=2))
-        w.write("\n")
+def save_deck(deck: LeitnerAudioDeck | LeitnerQueueDeck, destination: pathlib.Path):
+    DeckFile.save_deck(deck.cards, destination)
 
 
 def load_review_deck(source: pathlib.Path) -> LeitnerAudioDeck:
-    deck: LeitnerAudioDeck
-    jsonpickle.load_backend('simplejson', 'dumps', 'loads', ValueError)
-    jsonpickle.set_preferred_backend('simplejson')
-    jsonpickle.set_encoder_options('simplejson', ensure_ascii=False)
     if not os.path.exists(source):
         raise RuntimeError(f"Review deck {source} not found.")
-    with open(source, "r") as r:
-        json_text = r.read()
-        return jsonpickle.loads(json_text)
+    return DeckFile.load_deck(pathlib.Path(source))
 
 
 def collect_audio(dataset: str, out_dir: str, deck: LeitnerAudioDeck) -> None:
@@ -571,11 +427,10 @@ def collect_audio(dataset: str, out_dir: str, deck: LeitnerAudioDeck) -> None:
 
 def main() -> None:
     random.seed(0)  # Make output idempotent for consecutive runs on the same day.
-    global cfg, max_new_reached, review_count, max_review_cards_this_session
+    global cfg
     global main_deck, discards_deck, finished_deck, active_deck
     deck_source: str
 
-    util: CardUtils = CardUtils()
     os.chdir(os.path.dirname(__file__))
 
     options: Options = parse_args()
@@ -583,6 +438,16 @@ def main() -> None:
     dataset: str = options.dataset
     if options.mp4 is not None:
         cfg.create_mp4 = options.mp4
+    tts.clip_cache.max_bytes = cfg.clip_cache_mb * 1024 * 1024
+    tts.polly_threads = cfg.polly_threads
+    tts.polly_limiter.rate = cfg.polly_max_rate
+    tts.polly_retries = cfg.polly_retries
+    tts.tts_shards = cfg.tts_shards
+    tts.tts_shard_threads = cfg.tts_shard_threads
+    tts.tts_shard_retries = cfg.tts_shard_retries
+    tts.toucan_worker_cmd = [os.path.expanduser(arg) for arg in cfg.tts_worker]
+    tts.dry_run = options.plan_only
+    tts.load_cache_index()
 
     out_dir: str
 
@@ -596,18 +461,19 @@ def main() -> None:
     else:
         deck_source = dataset
 
-    shutil.rmtree(out_dir, ignore_errors=True)
     os.makedirs(out_dir, exist_ok=True)
 
-    main_deck = load_main_deck(os.path.join("cherokee-vocab-data", deck_source + ".txt"))
+    main_deck = load_parsed_deck(os.path.join("cherokee-vocab-data", deck_source + ".txt"))
+    if options.review_sheets:
+        export_review_sheets(main_deck.cards, out_dir, dataset, options.review_sheets)
 
     if cfg.resort_by_length:
-        main_deck.cards.sort(key=lambda c: c.data.sort_key)
+        main_deck.sort(key=lambda c: c.data.sort_key)
     save_deck(main_deck, pathlib.Path("decks", f"{dataset}-orig.json"))
 
     create_card_audio(main_deck)
 
-    if cfg.collect_audio:
+    if cfg.collect_audio and not options.plan_only:
         collect_audio(dataset, out_dir, main_deck)
         if options.only_assemble:
             return
@@ -618,7 +484,63 @@ def main() -> None:
             finished_deck.append(card)
         # save_deck(main_deck, pathlib.Path("decks", f"{dataset}-with-review-cards.json"))
 
-    prompts = Prompts.create_prompts()
+    prompts: Prompts.PromptLibrary = Prompts.create_prompts()
+
+    # Schedule every session first. The plans hold no audio and can be rendered in any order.
+    plans: list[SessionPlan] = plan_sessions(dataset, prompts)
+    if options.plan_only:
+        report_plans(out_dir, plans)
+        tts.save_cache_index()
+        return
+    render_sessions(dataset, out_dir, plans, options.jobs, options.rerender)
+
+    info_out_dir: str = os.path.join(out_dir, "info")
+    os.makedirs(info_out_dir, exist_ok=True)
+
+    with open(os.path.join(info_out_dir, "end-notes.txt"), "w") as w:
+        for plan in plans:
+            w.write(f"{plan.session + 1:04d}: {plan.end_note}\n")
+
+    with open(os.path.join(info_out_dir, "track-info.txt"), "w") as w:
+        for plan in plans:
+            metadata = plan.tags
+            w.write(f"{plan.session + 1:04d}|{metadata['date']}|{metadata['title']}|{metadata['album']}|{metadata['duration']}\n")
+
+    metadata_by_track: dict[int, dict[str, str]] = {plan.session: plan.tags for plan in plans}
+    with open(os.path.join(info_out_dir, "track-info.json"), "w") as w:
+        simplejson.dump(metadata_by_track, w, indent=2, sort_keys=True, ensure_ascii=False)
+        w.write("\n")
+
+    save_deck(finished_deck, pathlib.Path("decks", f"{dataset}.json"))
+    tts.save_cache_index()
+
+    print(f"Clip cache: {tts.clip_cache}")
+
+
+def report_plans(out_dir: str, plans: list[SessionPlan]) -> None:
+    """Prints the card counts and duration of each planned session and writes the plans as JSON."""
+    total_seconds: float = 0.0
+    print(f"{'Session':>7} {'New':>5} {'Review':>6} {'Cards':>5} {'Seconds':>9}")
+    for plan in plans:
+        total_seconds += plan.duration_seconds
+        print(f"{plan.session + 1:7d} {plan.new_count:5d} {plan.review_count:6d} {len(plan.cards):5d}"
+              f" {plan.duration_seconds:9.1f}")
+    print(f"Sessions: {len(plans):,}. Total: {total_seconds:,.1f} seconds.")
+
+    info_out_dir: str = os.path.join(out_dir, "info")
+    os.makedirs(info_out_dir, exist_ok=True)
+    plan_file: str = os.path.join(info_out_dir, "plan.json")
+    with open(plan_file, "w") as w:
+        simplejson.dump([plan.to_dict() for plan in plans], w, indent=2, ensure_ascii=False)
+        w.write("\n")
+    print(f"Plan written to {plan_file}.")
+
+
+def plan_sessions(dataset: str, prompts: Prompts.PromptLibrary) -> list[SessionPlan]:
+    """Runs the Leitner scheduling for every session, without producing any session output."""
+    global max_new_reached, review_count, max_review_cards_this_session
+    util: CardUtils = CardUtils()
+    plans: list[SessionPlan] = list()
 
     _exercise_set: int = 0
     keep_going: bool = True
@@ -632,9 +554,6 @@ def main() -> None:
             short_speech_intro = True
             break
 
-    end_notes_by_track: dict[int, str] = dict()
-    metadata_by_track: dict[int, dict[str, str]] = dict()
-
     while keep_going and (_exercise_set < cfg.sessions_to_create or cfg.create_all_sessions):
 
         if _exercise_set > 0:
@@ -644,61 +563,64 @@ def main() -> None:
         print(f"=== DAY: {_exercise_set + 1:04}")
         print()
 
-        lead_in: AudioSegment = AudioSegment.silent(750, LESSON_HZ).set_channels(1)
+        lead_in: SessionTimeline = SessionTimeline(LESSON_HZ, loader=tts.load_audio)
+        lead_in.append_silence(750)
         # Exercise set title
-        lead_in = lead_in.append(prompts[dataset])
-        lead_in = lead_in.append(AudioSegment.silent(750))
+        append_clip(lead_in, prompts[dataset])
+        lead_in.append_silence(750)
 
         if _exercise_set == 0:
             # Description of exercise set
             if dataset + "-about" in prompts:
-                lead_in = lead_in.append(prompts[dataset + "-about"])
-                lead_in = lead_in.append(AudioSegment.silent(750))
+                append_clip(lead_in, prompts[dataset + "-about"])
+                lead_in.append_silence(750)
 
             if dataset + "-notes" in prompts:
-                lead_in = lead_in.append(prompts[dataset + "-about"])
-                lead_in = lead_in.append(AudioSegment.silent(750))
+                append_clip(lead_in, prompts[dataset + "-about"])
+                lead_in.append_silence(750)
 
             # Pre-lesson verbiage
-            lead_in = lead_in.append(prompts["language_culture_1"])
-            lead_in = lead_in.append(AudioSegment.silent(1_500))
+            append_clip(lead_in, prompts["language_culture_1"])
+            lead_in.append_silence(1_500)
 
-            lead_in = lead_in.append(prompts["keep_going"])
-            lead_in = lead_in.append(AudioSegment.silent(1_500))
+            append_clip(lead_in, prompts["keep_going"])
+            lead_in.append_silence(1_500)
 
-            lead_in = lead_in.append(prompts["learn_sounds_first"])
-            lead_in = lead_in.append(AudioSegment.silent(2_250))
+            append_clip(lead_in, prompts["learn_sounds_first"])
+            lead_in.append_silence(2_250)
 
-            lead_in = lead_in.append(prompts["intro_2"])
-            lead_in = lead_in.append(AudioSegment.silent(1_500))
+            append_clip(lead_in, prompts["intro_2"])
+            lead_in.append_silence(1_500)
 
-            lead_in = lead_in.append(prompts["intro_3"])
-            lead_in = lead_in.append(AudioSegment.silent(1_500))
+            append_clip(lead_in, prompts["intro_3"])
+            lead_in.append_silence(1_500)
 
             if short_speech_intro:
-                lead_in = lead_in.append(prompts["short-speech"])
-                lead_in = lead_in.append(AudioSegment.silent(1_500))
+                append_clip(lead_in, prompts["short-speech"])
+                lead_in.append_silence(1_500)
                 short_speech_intro = False
 
             # Let us begin
-            lead_in = lead_in.append(prompts["begin"])
-            lead_in = lead_in.append(AudioSegment.silent(750))
+            append_clip(lead_in, prompts["begin"])
+            lead_in.append_silence(750)
 
         session_start: str = f"Day {_exercise_set + 1}."
-        lead_in = lead_in.append(tts.en_audio(Prompts.AMZ_VOICE_INSTRUCTOR, session_start))
-        lead_in = lead_in.append(AudioSegment.silent(750))
-
-        lead_out: AudioSegment = AudioSegment.silent(2_250, LESSON_HZ).set_channels(1)
-        lead_out = lead_out.append(prompts["concludes_this_exercise"])
-        lead_out = lead_out.append(AudioSegment.silent(2_250))
-        lead_out = lead_out.append(prompts["copy_1"])
-        lead_out = lead_out.append(AudioSegment.silent(1_500))
-        lead_out = lead_out.append(prompts["copy_by_sa"])
-        lead_out = lead_out.append(AudioSegment.silent(2_250))
-        lead_out = lead_out.append(prompts["produced"])
-        lead_out = lead_out.append(AudioSegment.silent(2_250))
-
-        main_audio: AudioSegment = AudioSegment.silent(100, LESSON_HZ).set_channels(1)
+        append_clip(lead_in, tts.en_clip(Prompts.AMZ_VOICE_INSTRUCTOR, session_start))
+        lead_in.append_silence(750)
+
+        lead_out: SessionTimeline = SessionTimeline(LESSON_HZ, loader=tts.load_audio)
+        lead_out.append_silence(2_250)
+        append_clip(lead_out, prompts["concludes_this_exercise"])
+        lead_out.append_silence(2_250)
+        append_clip(lead_out, prompts["copy_1"])
+        lead_out.append_silence(1_500)
+        append_clip(lead_out, prompts["copy_by_sa"])
+        lead_out.append_silence(2_250)
+        append_clip(lead_out, prompts["produced"])
+        lead_out.append_silence(2_250)
+
+        main_audio: SessionTimeline = SessionTimeline(LESSON_HZ, loader=tts.load_audio)
+        main_audio.append_silence(100)
 
         new_count: int = 0
         introduced_count: int = 0
@@ -735,6 +657,8 @@ def main() -> None:
         review_cards: list[str] = list()
         hidden_cards: list[str] = list()
 
+        planned_cards: list[PlannedCard] = list()
+
         while (lead_in.duration_seconds + lead_out.duration_seconds + main_audio.duration_seconds
                < cfg.session_max_duration):
             start_length: float = main_audio.duration_seconds
@@ -751,6 +675,9 @@ def main() -> None:
                 card_stats.show_again_delay = 32
                 continue
             prev_card_id = card_id
+            planned_card: PlannedCard = PlannedCard(card_id=card_id, challenge=data.challenge, new_card=new_card,
+                                                    introduced=introduce_card)
+            planned_cards.append(planned_card)
             if new_card:
                 if not first_new_challenge:
                     first_new_challenge = data.challenge
@@ -783,17 +710,17 @@ def main() -> None:
                 if new_count >= max_new_cards_this_session:
                     max_new_reached = True
                     print(f" - No more new cards this session.")
-                main_audio = main_audio.append(AudioSegment.silent(1_500))
+                main_audio.append_silence(1_500)
                 card_stats.new_card = False
                 if introduce_card:
-                    main_audio = append_introduce_phrase(main_audio, prompts, _exercise_set, new_count)
+                    append_introduce_phrase(main_audio, prompts, _exercise_set, new_count)
             if not introduce_card:
                 if not new_card:
                     challenge_count += 1
                 if extra_delay > 0:
                     _: int = int(1_000 * min(7.0, extra_delay))
-                    main_audio = main_audio.append(AudioSegment.silent(_), crossfade=0)
-                main_audio = append_translate_phrase(main_audio, prompts, _exercise_set, challenge_count)
+                    main_audio.append_silence(_, crossfade=0)
+                append_translate_phrase(main_audio, prompts, _exercise_set, challenge_count)
                 if not card_stats.shown:
                     if not first_review_challenge:
                         first_review_challenge = data.challenge
@@ -822,76 +749,82 @@ def main() -> None:
             srt_entry.text = challenge
             srt_entry.start = main_audio.duration_seconds
             srt_entries.append(srt_entry)
-            data_file: AudioSegment = tts.chr_audio(next_ims_voice(data.sex), challenge, cfg.alpha)
-            main_audio = main_audio.append(data_file, crossfade=0)
+            voice: str = next_ims_voice(data.sex)
+            planned_card.voices.append(voice)
+            data_file: str = tts.chr_clip(voice, challenge, cfg.alpha)
+            append_clip(main_audio, data_file, crossfade=0)
             srt_entry.end = main_audio.duration_seconds
             if introduce_card:
                 # introduce Cherokee challenge
-                main_audio = main_audio.append(AudioSegment.silent(1_500))
-                data_file: AudioSegment = tts.chr_audio(next_ims_voice(data.sex), challenge, cfg.alpha)
+                main_audio.append_silence(1_500)
+                voice = next_ims_voice(data.sex)
+                planned_card.voices.append(voice)
+                data_file = tts.chr_clip(voice, challenge, cfg.alpha)
                 if new_count < 8 and _exercise_set == 0:
-                    main_audio = main_audio.append(prompts["listen_again"])
+                    append_clip(main_audio, prompts["listen_again"])
                 else:
-                    main_audio = main_audio.append(prompts["listen_again_short"])
-                main_audio = main_audio.append(AudioSegment.silent(1_500))
+                    append_clip(main_audio, prompts["listen_again_short"])
+                main_audio.append_silence(1_500)
                 srt_entry: SrtEntry = SrtEntry()
                 srt_entries.append(srt_entry)
                 srt_entry.text = challenge
                 srt_entry.start = main_audio.duration_seconds
-                main_audio = main_audio.append(data_file, crossfade=0)
+                append_clip(main_audio, data_file, crossfade=0)
                 srt_entry.end = main_audio.duration_seconds
-                main_audio = main_audio.append(AudioSegment.silent(1_500))
+                main_audio.append_silence(1_500)
 
                 # introduce alt pronunciations
                 if len(data.challenge_alts) >  1:
                     if new_count < 6 and _exercise_set <= 2:
-                        main_audio = main_audio.append(prompts["also_hear"])
+                        append_clip(main_audio, prompts["also_hear"])
                     else:
-                        main_audio = main_audio.append(prompts["also_hear_short"])
-                    main_audio = main_audio.append(AudioSegment.silent(1_000))
+                        append_clip(main_audio, prompts["also_hear_short"])
+                    main_audio.append_silence(1_000)
                     for alt in data.challenge_alts:
                         if alt == challenge:
                             continue
-                        main_audio = main_audio.append(AudioSegment.silent(500))
+                        main_audio.append_silence(500)
                         srt_entry: SrtEntry = SrtEntry()
                         srt_entries.append(srt_entry)
                         srt_entry.text = alt
                         srt_entry.start = main_audio.duration_seconds
-                        main_audio = main_audio.append(tts.chr_audio(next_ims_voice(data.sex), alt, cfg.alpha),
-                                                       crossfade=0)
+                        voice = next_ims_voice(data.sex)
+                        planned_card.voices.append(voice)
+                        append_clip(main_audio, tts.chr_clip(voice, alt, cfg.alpha), crossfade=0)
                         srt_entry.end = main_audio.duration_seconds
-                        main_audio = main_audio.append(AudioSegment.silent(1_000))
+                        main_audio.append_silence(1_000)
 
                 # output English gloss
                 if new_count < 10 and _exercise_set == 0:
-                    main_audio = main_audio.append(prompts["its_translation_is"])
-                    main_audio = main_audio.append(AudioSegment.silent(750))
+                    append_clip(main_audio, prompts["its_translation_is"])
+                    main_audio.append_silence(750)
                 else:
-                    main_audio = main_audio.append(prompts["in_english"])
-                    main_audio = main_audio.append(AudioSegment.silent(750))
+                    append_clip(main_audio, prompts["in_english"])
+                    main_audio.append_silence(750)
             else:
-                gap_duration: float = max(data_file.duration_seconds, 1.0)
-                main_audio = main_audio.append(AudioSegment.silent(int(1_000 * gap_duration)))
+                gap_duration: float = max(clip_seconds(data_file), 1.0)
+                main_audio.append_silence(int(1_000 * gap_duration))
 
             # The answer
-            answer_audio: AudioSegment = tts.en_audio(next_amz_voice(data.sex), data.answer)
+            voice = next_amz_voice(data.sex)
+            planned_card.voices.append(voice)
+            answer_audio: str = tts.en_clip(voice, data.answer)
             # Silence gap for user to respond during. Only if the card was not introduced.
             if not introduce_card:
-                _ = AudioSegment.silent(int((2 + 1.1 * answer_audio.duration_seconds) * 1_000))
-                main_audio = main_audio.append(_)
+                main_audio.append_silence(int((2 + 1.1 * clip_seconds(answer_audio)) * 1_000))
             # Provide answer.
             srt_entry: SrtEntry = SrtEntry()
             srt_entry.text = data.answer
             srt_entry.start = main_audio.duration_seconds
             srt_entries.append(srt_entry)
-            main_audio = main_audio.append(answer_audio)
+            append_clip(main_audio, answer_audio)
             srt_entry.end = main_audio.duration_seconds
             if _exercise_set == 0:
-                main_audio = main_audio.append(AudioSegment.silent(2_250))
+                main_audio.append_silence(2_250)
             elif _exercise_set < 5:
-                main_audio = main_audio.append(AudioSegment.silent(1_500))
+                main_audio.append_silence(1_500)
             else:
-                main_audio = main_audio.append(AudioSegment.silent(750))
+                main_audio.append_silence(750)
 
             delta_tick: float = main_audio.duration_seconds - start_length
             active_deck.update_time(delta_tick)
@@ -927,13 +860,11 @@ def main() -> None:
               f" Hidden new cards: {hidden_count:,}.")
 
         challenge_start: str = first_new_challenge if first_new_challenge else first_review_challenge
-        # challenge_start = re.sub("(?i)[^a-z- ]", "", unicodedata.normalize("NFD", challenge_start))
         challenge_start = unicodedata.normalize("NFC", challenge_start).strip()
         while challenge_start[-1] in ".,!?:":
             challenge_start = challenge_start[:-1]
 
         challenge_stop: str = last_new_challenge if last_new_challenge else last_review_challenge
-        # challenge_stop = re.sub("(?i)[^a-z- ]", "", unicodedata.normalize("NFD", challenge_stop))
         challenge_stop = unicodedata.normalize("NFC", challenge_stop).strip()
         while challenge_stop[-1] in ".,!?:":
             challenge_stop = challenge_stop[:-1]
@@ -981,36 +912,16 @@ def main() -> None:
         tags["comments"] = "https://github.com/CherokeeLanguage/IMS-Toucan"
         tags["year"] = str(date.today().year)
 
-        metadata_by_track[_exercise_set] = tags
-
-        # Put mp3 for website related stuff in subfolder
-        mp3_out_dir: str = os.path.join(out_dir, "mp3")
-        os.makedirs(mp3_out_dir, exist_ok=True)
-
-        srt_out_dir: str = os.path.join(out_dir, "srt")
-        os.makedirs(srt_out_dir, exist_ok=True)
-
-        # Track vocab by session
-        vocab_out_dir: str = os.path.join(out_dir, "vocab")
-        os.makedirs(vocab_out_dir, exist_ok=True)
-
-        # Put graphic related stuff in subfolder
-        img_out_dir: str = os.path.join(out_dir, "img")
-        os.makedirs(img_out_dir, exist_ok=True)
-
-        # Put MP4 related stuff in subfolder
-        mp4_out_dir: str = os.path.join(out_dir, "mp4")
-        os.makedirs(mp4_out_dir, exist_ok=True)
-
         # Output exercise audio
-        combined_audio: AudioSegment = lead_in.append(main_audio)
+        combined_audio: SessionTimeline = SessionTimeline(LESSON_HZ, loader=tts.load_audio)
+        combined_audio.append(lead_in, crossfade=0)
+        combined_audio.append(main_audio)
         # Add any special end of session notes.
         if end_note:
-            combined_audio = combined_audio.append(AudioSegment.silent(2_250))
-            combined_audio = combined_audio.append(tts.en_audio(Prompts.AMZ_VOICE_INSTRUCTOR, end_note))
+            combined_audio.append_silence(2_250)
+            append_clip(combined_audio, tts.en_clip(Prompts.AMZ_VOICE_INSTRUCTOR, end_note))
             print(f"* {end_note}")
-        end_notes_by_track[_exercise_set] = end_note
-        combined_audio = combined_audio.append(lead_out)
+        combined_audio.append(lead_out)
 
         # Add leadin offset to SRT entries. Assign sequence numbers. Capitalize first letter.
         _: int = 0
@@ -1021,215 +932,355 @@ def main() -> None:
             srt_entry.end += lead_in.duration_seconds  # + 0.125  # disappear slightly late
             srt_entry.text = srt_entry.text[0].upper() + srt_entry.text[1:]
 
-        # Output SRT file for use by ffmpeg mp4 creation process
-        srt_name: str = f"{dataset}-{_exercise_set + 1:04}.srt"
-        output_srt: str = os.path.join(srt_out_dir, srt_name)
-        with open(output_srt, "w") as srt:
-            for srt_entry in srt_entries:
-                srt_text: str = unicodedata.normalize("NFC", str(srt_entry))
-                srt.write(srt_text)
-
-        # Output New Vocabulary, Hidden Vocabulary, and Review Vocabulary lists
-        vocab_name: str = f"{dataset}-{_exercise_set + 1:04}-vocab-new.txt"
-        output_vocab: str = os.path.join(vocab_out_dir, vocab_name)
-        with open(os.path.join(output_vocab), "w") as w:
-            for entry in new_cards:
-                w.write(f"{entry}\n")
-            if end_note:
-                w.write(f"# {end_note}\n")
-        vocab_name: str = f"{dataset}-{_exercise_set + 1:04}-vocab-hidden.txt"
-        output_vocab: str = os.path.join(vocab_out_dir, vocab_name)
-        with open(os.path.join(output_vocab), "w") as w:
-            for entry in hidden_cards:
-                w.write(f"{entry}\n")
-            if end_note:
-                w.write(f"# {end_note}\n")
-        vocab_name: str = f"{dataset}-{_exercise_set + 1:04}-vocab-review.txt"
-        output_vocab: str = os.path.join(vocab_out_dir, vocab_name)
-        with open(os.path.join(output_vocab), "w") as w:
-            for entry in review_cards:
-                w.write(f"{entry}\n")
-            if end_note:
-                w.write(f"# {end_note}\n")
-
-        # Output mp3
-        mp3_name: str = f"{dataset}-{_exercise_set + 1:04}.mp3"
-        output_mp3: str = os.path.join(mp3_out_dir, mp3_name)
         minutes: int = int(combined_audio.duration_seconds // 60)
         seconds: int = int(combined_audio.duration_seconds) % 60
         tags["duration"] = f"{minutes:02d}:{seconds:02d}"
-        print(f"Creating {mp3_name}. {tags['duration']}.")
-        save_title = tags["title"]
-        if tags["album"]:
-            tags["title"] = tags["title"] + " (" + tags["album"] + ")"
-        combined_audio.set_frame_rate(MP3_HZ).export(output_mp3 + ".tmp", format="mp3",
-                                                     parameters=["-qscale:a", str(MP3_QUALITY)], tags=tags)
-        tags["title"] = save_title
-        shutil.move(output_mp3 + ".tmp", output_mp3)
-
-        # Generate graphic for MP4
-        svg_title: str
-        with open("cherokee-vocab-data/svg/title_template.svg", "r") as r:
-            svg_title = r.read()
-        svg_title = svg_title.replace("_album_", tags["album"])
-        title = tags["title"]
-        if "]" in title:
-            svg_title = svg_title.replace("_title1_", title[:title.index("]") + 1].strip())
-            svg_title = svg_title.replace("_title2_", title[title.index("]") + 1:].strip())
-        else:
-            svg_title = svg_title.replace("_title1_", tags["title"])
-            svg_title = svg_title.replace("_title2_", " ")
-        svg_title = svg_title.replace("_artist_", tags["artist"])
 
-        if end_note:
-            svg_title = svg_title.replace("_end_note_", end_note)
-        else:
-            svg_title = svg_title.replace("_end_note_", " ")
-
-        new_items: str = f"{introduced_count + hidden_count:,}"
-        old_items: str = f"{review_count:,}"
-        svg_title = svg_title.replace("_new_", new_items)
-        svg_title = svg_title.replace("_old_", old_items)
-
-        svg_name: str = f"{dataset}-{_exercise_set + 1:04}.svg"
-        print(f"Creating {svg_name}.")
-        output_svg: str = os.path.join(img_out_dir, svg_name)
-        with open(output_svg, "w") as w:
-            w.write(svg_title)
-        png_name: str = f"{dataset}-{_exercise_set + 1:04}.png"
-        output_png: str = os.path.join(img_out_dir, png_name)
-        cmd: list[str] = list()
-        cmd.append("inkscape")
-        cmd.append("-o")
-        cmd.append(output_png)
-        cmd.append("-C")
-        cmd.append("--export-background=white")
-        cmd.append("--export-background-opacity=1.0")
-        cmd.append("--export-png-color-mode=RGB_16")
-        cmd.append("--export-area-page")
-        cmd.append(output_svg)
-        print(f"Creating {png_name}.")
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
-
-        if cfg.create_mp4:
-            mp4_name: str = f"{dataset}-{_exercise_set + 1:04}.mp4"
-            output_mp4: str = os.path.join(mp4_out_dir, mp4_name)
-
-            cmd: list[str] = list()
-            cmd.append("ffmpeg")
-            cmd.append("-nostdin")  # non-interactive
-            cmd.append("-y")  # overwrite
-            cmd.append("-r")  # input frame rate
-            cmd.append("1")
-            cmd.append("-loop")
-            cmd.append("1")
-            cmd.append("-i")
-            cmd.append(output_png)
-            cmd.append("-i")
-            cmd.append(output_mp3)
-            cmd.append("-shortest")
-            cmd.append("-q:a")
-            cmd.append("3")
-            cmd.append("-pix_fmt")
-            cmd.append("yuv420p")
-            cmd.append("-r")  # output frame rate
-            cmd.append("23.976")
-            cmd.append("-x264-params")
-            cmd.append(f"keyint={int(23.976*3600+1)}:scenecut=0")
-            cmd.append("-tune")
-            cmd.append("stillimage")
-            cmd.append("-movflags")
-            cmd.append("+faststart")
-
-            cmd.append(output_mp4+".tmp.mp4")
-
-            print(f"Creating {mp4_name}.")
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
-
-            cmd = list()
-            cmd.append("ffmpeg")
-            cmd.append("-nostdin")  # non-interactive
-            cmd.append("-y")  # overwrite
-            cmd.append("-i")
-            cmd.append(output_mp4+".tmp.mp4")
-            cmd.append("-i")
-            cmd.append(output_srt)
-            cmd.append("-c")
-            cmd.append("copy")
-            cmd.append("-c:s")
-            cmd.append("mov_text")
-            mp4_tags: dict[str, str] = tags.copy()
-            if mp4_tags["album"]:
-                mp4_tags["title"] = mp4_tags["title"] + " (" + mp4_tags["album"] + ")"
-            for k, v in mp4_tags.items():
-                cmd.append("-metadata")
-                cmd.append(f"{k}={v}")
-            cmd.append("-movflags")
-            cmd.append("+faststart")
-            cmd.append(output_mp4)
-
-            print(f"Adding subtitles to {mp4_name}.")
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
-            os.unlink(output_mp4+".tmp.mp4")
+        plan: SessionPlan = SessionPlan()
+        plan.session = _exercise_set
+        plan.cards = planned_cards
+        plan.timeline = combined_audio.to_dict()
+        plan.srt_entries = srt_entries
+        plan.tags = tags
+        plan.new_cards = new_cards
+        plan.hidden_cards = hidden_cards
+        plan.review_cards = review_cards
+        plan.end_note = end_note
+        plan.new_count = introduced_count + hidden_count
+        plan.review_count = review_count
+        plans.append(plan)
 
         # Bump counter
         _exercise_set += 1
 
-        # Free up memory
-        del lead_in
-        del lead_out
-        del main_audio
-        del combined_audio
-        del svg_title
-
         if not main_deck.has_cards:
             keep_going = extra_sessions > 0
             extra_sessions -= 1
 
-    info_out_dir: str = os.path.join(out_dir, "info")
-    os.makedirs(info_out_dir, exist_ok=True)
-
-    with open(os.path.join(info_out_dir, "end-notes.txt"), "w") as w:
-        for _ in range(_exercise_set):
-            if _ not in end_notes_by_track:
-                continue
-            end_note = end_notes_by_track[_]
-            w.write(f"{_ + 1:04d}: {end_note}\n")
-
-    with open(os.path.join(info_out_dir, "track-info.txt"), "w") as w:
-        for _ in range(_exercise_set):
-            if _ not in metadata_by_track:
-                continue
-            metadata = metadata_by_track[_]
-            w.write(f"{_ + 1:04d}|{metadata['date']}|{metadata['title']}|{metadata['album']}|{metadata['duration']}\n")
-
-    with open(os.path.join(info_out_dir, "track-info.json"), "w") as w:
-        simplejson.dump(metadata_by_track, w, indent=2, sort_keys=True, ensure_ascii=False)
+    return plans
+
+
+def render_sessions(dataset: str, out_dir: str, plans: list[SessionPlan], jobs: int = 1,
+                    rerender: bool = False) -> None:
+    """
+    Renders the planned sessions, in parallel worker processes when jobs is more than 1.
+    Sessions whose fingerprint and output files match the render manifest are kept as they are.
+    """
+    manifest_file: str = os.path.join(out_dir, "info", "render-manifest.json")
+    manifest: dict[str, dict] = load_render_manifest(manifest_file)
+    fingerprints: dict[str, str] = {session_key(plan): render_fingerprint(plan, cfg.create_mp4) for plan in plans}
+    changed: list[SessionPlan] = list()
+    for plan in plans:
+        key: str = session_key(plan)
+        previous: dict | None = manifest.get(key)
+        if rerender or not previous or previous["fingerprint"] != fingerprints[key] \
+                or not all(os.path.exists(os.path.join(out_dir, file)) for file in previous["files"]):
+            changed.append(plan)
+    # Remove outputs of sessions no longer planned.
+    for key in set(manifest) - set(fingerprints):
+        for file in manifest.pop(key)["files"]:
+            if os.path.exists(os.path.join(out_dir, file)):
+                os.remove(os.path.join(out_dir, file))
+    print(f"Rendering {len(changed):,} of {len(plans):,} sessions. The others are unchanged.")
+
+    def rendered(plan: SessionPlan) -> None:
+        manifest[session_key(plan)] = {"fingerprint": fingerprints[session_key(plan)],
+                                       "files": session_files(dataset, plan, cfg.create_mp4)}
+        save_render_manifest(manifest_file, manifest)
+
+    if jobs <= 1:
+        for plan in changed:
+            render_session(dataset, out_dir, plan, cfg.create_mp4)
+            rendered(plan)
+    else:
+        print(f"Rendering {len(changed):,} sessions with {jobs:,} workers.")
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures: dict[Future, SessionPlan] = {
+                executor.submit(render_session, dataset, out_dir, plan, cfg.create_mp4): plan for plan in changed}
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                future.result()
+                rendered(futures[future])
+    save_render_manifest(manifest_file, manifest)
+
+
+def session_key(plan: SessionPlan) -> str:
+    return f"{plan.session + 1:04d}"
+
+
+def session_files(dataset: str, plan: SessionPlan, create_mp4: bool) -> list[str]:
+    """The files render_session writes for the plan, relative to the output directory."""
+    name: str = f"{dataset}-{plan.session + 1:04}"
+    files: list[str] = [f"srt/{name}.srt", f"vocab/{name}-vocab-new.txt", f"vocab/{name}-vocab-hidden.txt",
+                        f"vocab/{name}-vocab-review.txt", f"mp3/{name}.mp3", f"img/{name}.svg", f"img/{name}.png"]
+    if create_mp4:
+        files.append(f"mp4/{name}.mp4")
+    return files
+
+
+def render_fingerprint(plan: SessionPlan, create_mp4: bool) -> str:
+    """
+    Hashes everything a session's output is rendered from: its clips in order with their cache file sizes and
+    times, silences, crossfades, subtitles, vocabulary lists, tags, and title template.
+    The spoken production date is one of the clips, so sessions are rendered again on a new day. The date tags
+    are left out, since they change with every run and follow the spoken date.
+    """
+    clips: list = list()
+
+    def add_clips(timeline: dict) -> None:
+        for entry in timeline["entries"]:
+            if "timeline" in entry:
+                add_clips(entry["timeline"])
+            elif entry.get("file"):
+                info = tts.cache_index.get(entry["file"])
+                stat: tuple[int, int] = (info.size, info.mtime_ns) if info else (0, 0)
+                clips.append([entry["file"], *stat, entry["frames"], entry["crossfade"]])
+            else:
+                clips.append(["silence", entry["frames"], entry["crossfade"]])
+
+    add_clips(plan.timeline)
+    tags: dict[str, str] = {k: v for k, v in plan.tags.items() if k not in ("date", "creation_time")}
+    with open(SVG_TEMPLATE, "rb") as r:
+        template_sha1: str = hashlib.sha1(r.read()).hexdigest()
+    inputs: dict = {"version": RENDER_VERSION, "mp3": [MP3_HZ, MP3_QUALITY], "mp4": create_mp4, "clips": clips,
+                    "srt": [str(srt_entry) for srt_entry in plan.srt_entries], "tags": tags,
+                    "new": plan.new_cards, "hidden": plan.hidden_cards, "review": plan.review_cards,
+                    "end_note": plan.end_note, "counts": [plan.new_count, plan.review_count],
+                    "template": template_sha1}
+    return hashlib.sha1(simplejson.dumps(inputs, sort_keys=True, ensure_ascii=False).encode("UTF-8")).hexdigest()
+
+
+def load_render_manifest(manifest_file: str) -> dict[str, dict]:
+    if not os.path.exists(manifest_file):
+        return dict()
+    with open(manifest_file, "r") as r:
+        manifest: dict = simplejson.load(r)
+    if manifest.get("version") != RENDER_VERSION:
+        return dict()
+    return manifest["sessions"]
+
+
+def save_render_manifest(manifest_file: str, sessions: dict[str, dict]) -> None:
+    os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+    with open(manifest_file + ".tmp", "w") as w:
+        simplejson.dump({"version": RENDER_VERSION, "sessions": sessions}, w, indent=2, sort_keys=True,
+                        ensure_ascii=False)
         w.write("\n")
-
-    save_deck(finished_deck, pathlib.Path("decks", f"{dataset}.json"))
-
-
-def append_translate_phrase(main_audio, prompts, _exercise_set, challenge_count):
+    os.replace(manifest_file + ".tmp", manifest_file)
+
+
+def render_session(dataset: str, out_dir: str, plan: SessionPlan, create_mp4: bool) -> None:
+    """Writes the MP3, SRT, vocabulary lists, title graphic, and MP4 for a planned session."""
+    _exercise_set: int = plan.session
+    tags: dict[str, str] = plan.tags
+    end_note: str = plan.end_note
+
+    # Put mp3 for website related stuff in subfolder
+    mp3_out_dir: str = os.path.join(out_dir, "mp3")
+    os.makedirs(mp3_out_dir, exist_ok=True)
+
+    srt_out_dir: str = os.path.join(out_dir, "srt")
+    os.makedirs(srt_out_dir, exist_ok=True)
+
+    # Track vocab by session
+    vocab_out_dir: str = os.path.join(out_dir, "vocab")
+    os.makedirs(vocab_out_dir, exist_ok=True)
+
+    # Put graphic related stuff in subfolder
+    img_out_dir: str = os.path.join(out_dir, "img")
+    os.makedirs(img_out_dir, exist_ok=True)
+
+    # Put MP4 related stuff in subfolder
+    mp4_out_dir: str = os.path.join(out_dir, "mp4")
+    os.makedirs(mp4_out_dir, exist_ok=True)
+
+    # Output exercise audio
+    combined_audio: SessionTimeline = SessionTimeline.from_dict(plan.timeline, tts.load_audio)
+
+    # Output SRT file for use by ffmpeg mp4 creation process
+    srt_name: str = f"{dataset}-{_exercise_set + 1:04}.srt"
+    output_srt: str = os.path.join(srt_out_dir, srt_name)
+    with open(output_srt, "w") as srt:
+        for srt_entry in plan.srt_entries:
+            srt_text: str = unicodedata.normalize("NFC", str(srt_entry))
+            srt.write(srt_text)
+
+    # Output New Vocabulary, Hidden Vocabulary, and Review Vocabulary lists
+    vocab_name: str = f"{dataset}-{_exercise_set + 1:04}-vocab-new.txt"
+    output_vocab: str = os.path.join(vocab_out_dir, vocab_name)
+    with open(os.path.join(output_vocab), "w") as w:
+        for entry in plan.new_cards:
+            w.write(f"{entry}\n")
+        if end_note:
+            w.write(f"# {end_note}\n")
+    vocab_name: str = f"{dataset}-{_exercise_set + 1:04}-vocab-hidden.txt"
+    output_vocab: str = os.path.join(vocab_out_dir, vocab_name)
+    with open(os.path.join(output_vocab), "w") as w:
+        for entry in plan.hidden_cards:
+            w.write(f"{entry}\n")
+        if end_note:
+            w.write(f"# {end_note}\n")
+    vocab_name: str = f"{dataset}-{_exercise_set + 1:04}-vocab-review.txt"
+    output_vocab: str = os.path.join(vocab_out_dir, vocab_name)
+    with open(os.path.join(output_vocab), "w") as w:
+        for entry in plan.review_cards:
+            w.write(f"{entry}\n")
+        if end_note:
+            w.write(f"# {end_note}\n")
+
+    # Output mp3
+    mp3_name: str = f"{dataset}-{_exercise_set + 1:04}.mp3"
+    output_mp3: str = os.path.join(mp3_out_dir, mp3_name)
+    print(f"Creating {mp3_name}. {tags['duration']}.")
+    mp3_tags: dict[str, str] = tags.copy()
+    if mp3_tags["album"]:
+        mp3_tags["title"] = mp3_tags["title"] + " (" + mp3_tags["album"] + ")"
+    combined_audio.export(output_mp3 + ".tmp", format="mp3", frame_rate=MP3_HZ,
+                          parameters=["-qscale:a", str(MP3_QUALITY)], tags=mp3_tags)
+    shutil.move(output_mp3 + ".tmp", output_mp3)
+
+    # Generate graphic for MP4
+    svg_title: str = title_svg(tags, end_note, plan)
+    svg_name: str = f"{dataset}-{_exercise_set + 1:04}.svg"
+    print(f"Creating {svg_name}.")
+    output_svg: str = os.path.join(img_out_dir, svg_name)
+    with open(output_svg, "w") as w:
+        w.write(svg_title)
+    png_name: str = f"{dataset}-{_exercise_set + 1:04}.png"
+    output_png: str = os.path.join(img_out_dir, png_name)
+    print(f"Creating {png_name}.")
+    rasterize_svg(svg_title, output_svg, output_png)
+
+    if create_mp4:
+        mp4_name: str = f"{dataset}-{_exercise_set + 1:04}.mp4"
+        output_mp4: str = os.path.join(mp4_out_dir, mp4_name)
+
+        # One pass: encode the still title frame and the AAC audio, and add the subtitles and tags.
+        cmd: list[str] = list()
+        cmd.append("ffmpeg")
+        cmd.append("-nostdin")  # non-interactive
+        cmd.append("-y")  # overwrite
+        cmd.append("-r")  # input frame rate
+        cmd.append("1")
+        cmd.append("-loop")
+        cmd.append("1")
+        cmd.append("-i")
+        cmd.append(output_png)
+        cmd.append("-i")
+        cmd.append(output_mp3)
+        cmd.append("-i")
+        cmd.append(output_srt)
+        cmd.append("-map")
+        cmd.append("0:v")
+        cmd.append("-map")
+        cmd.append("1:a")
+        cmd.append("-map")
+        cmd.append("2:s")
+        cmd.append("-shortest")
+        cmd.append("-c:a")
+        cmd.append("aac")
+        cmd.append("-q:a")
+        cmd.append("3")
+        cmd.append("-c:s")
+        cmd.append("mov_text")
+        cmd.append("-pix_fmt")
+        cmd.append("yuv420p")
+        cmd.append("-r")  # output frame rate
+        cmd.append("23.976")
+        cmd.append("-x264-params")
+        cmd.append(f"keyint={int(23.976*3600+1)}:scenecut=0")
+        cmd.append("-tune")
+        cmd.append("stillimage")
+        mp4_tags: dict[str, str] = tags.copy()
+        if mp4_tags["album"]:
+            mp4_tags["title"] = mp4_tags["title"] + " (" + mp4_tags["album"] + ")"
+        for k, v in mp4_tags.items():
+            cmd.append("-metadata")
+            cmd.append(f"{k}={v}")
+        cmd.append("-movflags")
+        cmd.append("+faststart")
+        cmd.append(output_mp4 + ".tmp.mp4")
+
+        print(f"Creating {mp4_name}.")
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+        shutil.move(output_mp4 + ".tmp.mp4", output_mp4)
+
+
+@functools.lru_cache(maxsize=None)
+def svg_template(svg_file: str = SVG_TEMPLATE) -> str:
+    """The title template, read once per process."""
+    with open(svg_file, "r") as r:
+        return r.read()
+
+
+def title_svg(tags: dict[str, str], end_note: str, plan: SessionPlan) -> str:
+    """The title graphic for a session, with the template's placeholders filled in."""
+    title: str = tags["title"]
+    title1: str = title
+    title2: str = " "
+    if "]" in title:
+        title1 = title[:title.index("]") + 1].strip()
+        title2 = title[title.index("]") + 1:].strip()
+    svg_title: str = svg_template()
+    svg_title = svg_title.replace("_album_", tags["album"])
+    svg_title = svg_title.replace("_title1_", title1)
+    svg_title = svg_title.replace("_title2_", title2)
+    svg_title = svg_title.replace("_artist_", tags["artist"])
+    svg_title = svg_title.replace("_end_note_", end_note if end_note else " ")
+    svg_title = svg_title.replace("_new_", f"{plan.new_count:,}")
+    svg_title = svg_title.replace("_old_", f"{plan.review_count:,}")
+    return svg_title
+
+
+def rasterize_svg(svg_title: str, output_svg: str, output_png: str) -> None:
+    """Rasterizes the title graphic in process with CairoSVG, or with Inkscape when CairoSVG is not available."""
+    if cairosvg is not None:
+        cairosvg.svg2png(bytestring=svg_title.encode("UTF-8"), write_to=output_png + ".tmp",
+                         background_color="white")
+        os.replace(output_png + ".tmp", output_png)
+        return
+    cmd: list[str] = list()
+    cmd.append("inkscape")
+    cmd.append("-o")
+    cmd.append(output_png)
+    cmd.append("-C")
+    cmd.append("--export-background=white")
+    cmd.append("--export-background-opacity=1.0")
+    cmd.append("--export-png-color-mode=RGB_16")
+    cmd.append("--export-area-page")
+    cmd.append(output_svg)
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+
+
+def clip_frames(file: str) -> int:
+    return tts.clip_frames(file)
+
+
+def clip_seconds(file: str) -> float:
+    return clip_frames(file) / LESSON_HZ
+
+
+def append_clip(timeline: SessionTimeline, file: str, crossfade: int = 100) -> None:
+    timeline.append_clip(file, clip_frames(file), crossfade)
+
+
+def append_translate_phrase(main_audio: SessionTimeline, prompts, _exercise_set, challenge_count) -> None:
     if challenge_count < 16 and _exercise_set == 0:
-        main_audio = main_audio.append(prompts["translate"])
+        append_clip(main_audio, prompts["translate"])
     else:
-        main_audio = main_audio.append(prompts["translate_short"])
-    main_audio = main_audio.append(AudioSegment.silent(1_000))
-    return main_audio
+        append_clip(main_audio, prompts["translate_short"])
+    main_audio.append_silence(1_000)
 
 
-def append_introduce_phrase(main_audio, prompts, _exercise_set, new_count):
+def append_introduce_phrase(main_audio: SessionTimeline, prompts, _exercise_set, new_count) -> None:
     if new_count < 6 and _exercise_set == 0:
         if new_count == 1:
             first_new_phrase = prompts["first_phrase"]
-            main_audio = main_audio.append(first_new_phrase)
+            append_clip(main_audio, first_new_phrase)
         else:
-            main_audio = main_audio.append(prompts["new_phrase"])
+            append_clip(main_audio, prompts["new_phrase"])
     else:
-        main_audio = main_audio.append(prompts["new_phrase_short"])
-    main_audio = main_audio.append(AudioSegment.silent(750))
-    return main_audio
+        append_clip(main_audio, prompts["new_phrase_short"])
+    main_audio.append_silence(750)
 
 
 def load_config(dataset: str):
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+IMS-Toucan synthesis worker for tts.py. The model is loaded once, then requests are read from stdin and answered
+on stdout one JSON object per line, as described in ToucanWorker.py.
+
+It has to run with the Python environment IMS-Toucan is installed in, so it is only used when tts_worker in
+the dataset config gives that interpreter. The checkout is found with --toucan, by default ~/git/IMS-Toucan.
+
+    "tts_worker": ["~/miniconda3/envs/toucan/bin/python", "run_tts_worker.py", "--toucan", "~/git/IMS-Toucan"]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import traceback
+from collections.abc import Callable
+from typing import TextIO
+
+DEFAULT_ALPHA: float = 1.3  # As passed to run_tts_file.py when no alpha is given.
+
+
+def serve(synthesize: Callable[[dict], None], r: TextIO, w: TextIO) -> None:
+    """Reports ready, then answers each request line with {"id": ...}, or with an "error" when synthesize raised."""
+    w.write(json.dumps({"ready": True}) + "\n")
+    w.flush()
+    for line in r:
+        line = line.strip()
+        if not line:
+            continue
+        request: dict = json.loads(line)
+        response: dict = {"id": request["id"]}
+        try:
+            synthesize(request)
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            response["error"] = f"{type(e).__name__}: {e}"
+        w.write(json.dumps(response) + "\n")
+        w.flush()
+
+
+def toucan_synthesizer(toucan_dir: str, device: str) -> Callable[[dict], None]:
+    """Loads the model and returns the function writing a request's MP3."""
+    os.chdir(toucan_dir)  # The model paths are relative to the checkout.
+    sys.path.insert(0, toucan_dir)
+    import torch
+    from pydub import AudioSegment
+    from InferenceInterfaces.InferenceFastSpeech2 import InferenceFastSpeech2
+
+    if not device:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    tts: InferenceFastSpeech2 = InferenceFastSpeech2(device=device, model_name="Meta")
+    default_ref: str | None = None
+
+    def synthesize(request: dict) -> None:
+        nonlocal default_ref
+        tts.set_language(request.get("lang", "chr"))
+        ref: str | None = request.get("ref") or None
+        if ref != default_ref:
+            tts.set_utterance_embedding(ref)
+            default_ref = ref
+        alpha: float = request.get("alpha") or DEFAULT_ALPHA
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            wav: str = os.path.join(tmp_dir, "tts.wav")
+            tts.read_to_file([request["text"]], wav, duration_scaling_factor=alpha, silent=True)
+            os.makedirs(os.path.dirname(request["mp3"]), exist_ok=True)
+            AudioSegment.from_wav(wav).export(request["mp3"], format="mp3")
+
+    return synthesize
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="IMS-Toucan synthesis worker.")
+    parser.add_argument("--toucan", type=str, default=os.path.expanduser("~/git/IMS-Toucan"))
+    parser.add_argument("--device", type=str, default="")
+    args: argparse.Namespace = parser.parse_args()
+    # Only protocol lines go to stdout. Anything IMS-Toucan prints goes to stderr.
+    protocol_out: TextIO = sys.stdout
+    sys.stdout = sys.stderr
+    synthesize: Callable[[dict], None] = toucan_synthesizer(os.path.expanduser(args.toucan), args.device)
+    serve(synthesize, sys.stdin, protocol_out)
+
+
+if __name__ == "__main__":
+    main()
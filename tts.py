@@ -1,25 +1,86 @@
 from __future__ import annotations
 
+import atexit
 import dataclasses
+import functools
+import heapq
 import pathlib
+import random
 import shutil
 import sys
 import tempfile
+import threading
+import time
+from collections.abc import Callable
+from typing import TextIO
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
 import hashlib
 import os
 import re
+import struct
 import subprocess
 import textwrap
 import unicodedata
 from boto3_type_annotations.polly import Client as Polly
+from botocore.exceptions import ClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
 from pydub import AudioSegment
 from pydub import effects
+from tqdm import tqdm
 
+from CacheIndex import CacheIndex
+from CacheIndex import ClipInfo
+from CacheIndex import ClipKey
+from ClipCache import ClipCache
+from RateLimiter import RateLimiter
+from ToucanWorker import ToucanRequest
+from ToucanWorker import ToucanResult
+from ToucanWorker import ToucanWorker
 from main import AMZ_HZ
 from main import CACHE_CHR
 from main import CACHE_EN
+from main import LESSON_HZ
+
+# Decoded and normalized clips, shared by every caller of chr_audio and en_audio.
+clip_cache: ClipCache = ClipCache()
+
+# Normalized PCM sidecar files are tagged with the size and mtime of the MP3 they were decoded from.
+PCM_MAGIC: bytes = b"ALGPCM01"
+PCM_HEADER: struct.Struct = struct.Struct("<8sQqIHH")  # magic, mp3 size, mp3 mtime ns, rate, channels, width
+
+# Which clips are cached, with their lengths in LESSON_HZ frames so sessions can be scheduled without decoding.
+cache_index: CacheIndex = CacheIndex()
+
+dry_run: bool = False  # Only work out file names and durations. Never synthesize or decode audio.
+
+# Amazon Polly. The provider is called once for the client shared by all threads. Replace it to use a fake
+# client or, with endpoint_url, a local stub endpoint.
+polly_provider: Callable[[], Polly] = lambda: boto3.Session().client("polly")
+polly_threads: int = 4
+polly_limiter: RateLimiter = RateLimiter(8.0)
+polly_retries: int = 5
+POLLY_RETRY_CODES: set[str] = {"ThrottlingException", "Throttling", "TooManyRequestsException",
+                               "ServiceFailureException", "ServiceUnavailableException"}
+_polly_client: Polly | None = None
+_polly_jitter: random.Random = random.Random()  # Kept apart from the seeded global random used for scheduling.
+_polly_lock: threading.Lock = threading.Lock()
+
+# IMS-Toucan synthesis worker, started on first use and kept running until exit. The command runs
+# run_tts_worker.py with IMS-Toucan's Python, or fake_tts_worker.py to run without the model. Without a command,
+# or when the worker fails to start, run_tts.py and run_tts_file.py are spawned instead.
+toucan_worker_cmd: list[str] = list()
+TOUCAN_ALPHA: float = 1.3  # Sent to run_tts_file.py and the worker when no alpha is given.
+_toucan_workers: dict[int, ToucanWorker] = dict()  # By shard.
+_toucan_worker_failed: bool = False
+
+# Cherokee batches are split into shards synthesized in parallel, each by its own process.
+tts_shards: int = 1
+tts_shard_threads: int = 0  # Inference threads per shard. Zero shares the CPUs between the shards.
+tts_shard_retries: int = 2
+
+BATCH_PREFIX: str = "audio-lessons-generator-"  # Temp dirs of run_tts_file.py batches.
 
 
 @dataclasses.dataclass
@@ -28,49 +89,241 @@ class TTSBatchEntry:
     text: str = ""
 
 
+def toucan_worker(shard_ix: int = 0, threads: int = 0) -> ToucanWorker | None:
+    """The shard's worker, started on first use. None if there is no worker command or a worker failed to start."""
+    global _toucan_worker_failed
+    if _toucan_worker_failed:
+        return None
+    worker: ToucanWorker | None = _toucan_workers.get(shard_ix)
+    if worker is None:
+        if not toucan_worker_cmd:
+            return None
+        worker = ToucanWorker(toucan_worker_cmd, shard_env(threads) if threads else None)
+        try:
+            worker.start()
+        except (OSError, RuntimeError) as e:
+            print(f"IMS-Toucan worker did not start, using run_tts.py instead. {e}", file=sys.stderr)
+            _toucan_worker_failed = True
+            return None
+        _toucan_workers[shard_ix] = worker
+        atexit.register(worker.close)
+    return worker
+
+
+def toucan_request(request_id: int, voice: str | None, text_chr: str, alpha: float | None) -> ToucanRequest:
+    ref: str = os.path.realpath(os.path.join("ref", f"{voice}.wav")) if voice else ""
+    mp3: str = os.path.realpath(get_mp3_chr(voice, text_chr, alpha))
+    return ToucanRequest(request_id, "chr", text_chr, ref, alpha if alpha else TOUCAN_ALPHA, mp3 + ".tmp")
+
+
 def tts_chr_batch(entries: list[TTSBatchEntry], alpha: float | None = None) -> None:
-    tmp_dir: pathlib.Path = pathlib.Path(tempfile.mkdtemp(prefix="audio-lessons-generator-"))
+    """Synthesizes the missing entries in tts_shards shards, each run by its own worker process."""
+    if dry_run:
+        return
+    recover_batches()
+    pending: dict[str, TTSBatchEntry] = dict()
+    for entry in entries:
+        mp3: str = get_mp3_chr(entry.voice, entry.text, alpha)
+        if mp3 not in pending and not has_mp3_chr(entry.voice, entry.text, alpha):
+            pending[mp3] = entry
+    if not pending:
+        return
+    shards: list[list[TTSBatchEntry]] = shard_entries(list(pending.values()), tts_shards)
+    threads: int = tts_shard_threads if tts_shard_threads > 0 else max(1, (os.cpu_count() or 1) // len(shards))
+    print(f"Synthesizing {len(pending):,} Cherokee clips in {len(shards):,} shards of {threads:,} threads each.")
+    with tqdm(total=len(pending)) as progress:
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            futures = [executor.submit(tts_chr_shard, ix, shard, alpha, threads, progress)
+                       for ix, shard in enumerate(shards)]
+            for future in futures:
+                future.result()
+    for entry in pending.values():
+        has_mp3_chr(entry.voice, entry.text, alpha)  # Keys the new files in the cache index.
+
+
+def shard_entries(entries: list[TTSBatchEntry], shard_count: int) -> list[list[TTSBatchEntry]]:
+    """Splits the entries into shards of about the same total text length, longest texts placed first."""
+    shard_count = max(1, min(shard_count, len(entries)))
+    shards: list[list[TTSBatchEntry]] = [list() for _ in range(shard_count)]
+    sizes: list[tuple[int, int]] = [(0, ix) for ix in range(shard_count)]
+    for entry in sorted(entries, key=lambda e: len(e.text), reverse=True):
+        size, ix = heapq.heappop(sizes)
+        shards[ix].append(entry)
+        heapq.heappush(sizes, (size + len(entry.text), ix))
+    return shards
+
+
+def tts_chr_shard(shard_ix: int, entries: list[TTSBatchEntry], alpha: float | None, threads: int,
+                  progress: tqdm) -> None:
+    """Runs one shard, retrying only the clips a failed attempt did not finish."""
+    for attempt in range(tts_shard_retries + 1):
+        entries = [entry for entry in entries if not has_mp3_chr(entry.voice, entry.text, alpha)]
+        if not entries:
+            return
+        try:
+            worker: ToucanWorker | None = toucan_worker(shard_ix, threads)
+            if worker:
+                tts_chr_worker(worker, entries, alpha, progress)
+            else:
+                tts_chr_file(entries, alpha, threads, progress)
+            return
+        except Exception as e:
+            if attempt == tts_shard_retries:
+                raise
+            print(f"Shard {shard_ix + 1:,} failed, retrying. {e}", file=sys.stderr)
+
+
+def shard_env(threads: int) -> dict[str, str]:
+    env: dict[str, str] = dict(os.environ)
+    env["OMP_NUM_THREADS"] = str(threads)
+    env["MKL_NUM_THREADS"] = str(threads)
+    return env
+
+
+def tts_chr_file(entries: list[TTSBatchEntry], alpha: float | None, threads: int, progress: tqdm) -> None:
+    """
+    Runs run_tts_file.py on the entries. It writes the MP3s in batch file order, so every .tmp file followed
+    by a later one is complete and is moved into the cache while the batch is still running. Each move is
+    recorded in the batch journal, which lets a later run recover a batch whose process died.
+    """
+    tmp_dir: pathlib.Path = pathlib.Path(tempfile.mkdtemp(prefix=BATCH_PREFIX))
     os.makedirs(tmp_dir, exist_ok=True)
     batch_file: pathlib.Path = tmp_dir.joinpath("tts-batch.txt")
-    cnt: int = 0
+    mp3_tmps: list[str] = list()
     with open(batch_file, "w") as w:
         for entry in entries:
-            if has_mp3_chr(entry.voice, entry.text, alpha):
-                continue
             mp3: str = os.path.realpath(get_mp3_chr(entry.voice, entry.text, alpha))
             voice_path: str = os.path.realpath(os.path.join("ref", f"{entry.voice}.wav"))
             w.write(f"chr|{entry.text}|{voice_path}|{mp3}.tmp\n")
-            cnt += 1
-    if not cnt:
-        return
+            mp3_tmps.append(f"{mp3}.tmp")
     cmd: list[str] = list()
     cmd.append(os.path.expanduser("~/git/IMS-Toucan/run_tts_file.py"))
     cmd.append("--text_file")
     cmd.append(str(batch_file))
     cmd.append("--alpha")
-    if alpha:
-        cmd.append(str(f"{alpha:.2f}"))
-    else:
-        cmd.append(str(f"1.3"))
-    result = subprocess.run(cmd, capture_output=False)
-    if result.returncode:
-        raise Exception("run_tts_file.py fail")
+    cmd.append(str(f"{alpha if alpha else TOUCAN_ALPHA:.2f}"))
+    process: subprocess.Popen | None = None
+    try:
+        with open(tmp_dir.joinpath("journal.txt"), "w") as journal:
+            journal.write(f"{os.getpid()}\n")
+            journal.flush()
+            process = subprocess.Popen(cmd, env=shard_env(threads))
+            while True:
+                returncode: int | None = process.poll()
+                progress.update(promote_batch(mp3_tmps, journal, returncode == 0))
+                if returncode is not None:
+                    break
+                time.sleep(1)
+        if returncode:
+            raise Exception("run_tts_file.py fail")
+        if mp3_tmps:
+            raise Exception(f"run_tts_file.py did not write {len(mp3_tmps):,} files")
+    finally:
+        if process is not None and process.poll() is None:
+            process.kill()
+            process.wait()
+        # Whatever was not promoted might be incomplete.
+        for mp3_tmp in mp3_tmps:
+            if os.path.exists(mp3_tmp):
+                os.remove(mp3_tmp)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def promote_batch(mp3_tmps: list[str], journal: TextIO, finished: bool) -> int:
+    """
+    Moves the completed .tmp files into the cache and removes them from mp3_tmps. Unless the batch finished,
+    the last .tmp file written might be incomplete and is left in place. Returns the count moved.
+    """
+    last: int = len(mp3_tmps)
+    if not finished:
+        last = 0
+        for ix in range(len(mp3_tmps) - 1, -1, -1):
+            if os.path.exists(mp3_tmps[ix]):
+                last = ix
+                break
+    promoted: list[str] = [mp3_tmp for mp3_tmp in mp3_tmps[:last] if os.path.exists(mp3_tmp)]
+    for mp3_tmp in promoted:
+        shutil.move(mp3_tmp, mp3_tmp.removesuffix(".tmp"))
+        cache_index.add(os.path.relpath(mp3_tmp.removesuffix(".tmp")))
+        journal.write(f"{mp3_tmp.removesuffix('.tmp')}\n")
+    journal.flush()
+    if promoted:
+        done: set[str] = set(promoted)
+        mp3_tmps[:] = [mp3_tmp for mp3_tmp in mp3_tmps if mp3_tmp not in done]
+    return len(promoted)
+
+
+def recover_batches() -> None:
+    """Promotes the completed files of batches left by dead processes, then removes their temp dirs."""
+    for tmp_dir in pathlib.Path(tempfile.gettempdir()).glob(BATCH_PREFIX + "*"):
+        journal_file: pathlib.Path = tmp_dir.joinpath("journal.txt")
+        batch_file: pathlib.Path = tmp_dir.joinpath("tts-batch.txt")
+        if journal_file.exists():
+            with open(journal_file, "r") as r:
+                pid: str = r.readline().strip()
+            if pid.isdigit() and process_alive(int(pid)):
+                continue
+        elif time.time() - tmp_dir.stat().st_mtime < 24 * 60 * 60:
+            continue  # Possibly still being written.
+        if batch_file.exists():
+            with open(batch_file, "r") as r:
+                mp3_tmps: list[str] = [line.rstrip("\n").split("|")[-1] for line in r if line.strip()]
+            with open(journal_file, "a") as journal:
+                count: int = promote_batch(mp3_tmps, journal, False)
+            if count:
+                print(f"Recovered {count:,} clips from {tmp_dir}.")
+            for mp3_tmp in mp3_tmps:
+                if os.path.exists(mp3_tmp):
+                    os.remove(mp3_tmp)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def tts_chr_worker(worker: ToucanWorker, entries: list[TTSBatchEntry], alpha: float | None, progress: tqdm) -> None:
+    """Streams the entries to the worker, moving each MP3 into the cache as soon as it is done."""
+    requests: dict[int, ToucanRequest] = dict()
     for entry in entries:
-        if has_mp3_chr(entry.voice, entry.text, alpha):
+        request: ToucanRequest = toucan_request(len(requests), entry.voice, entry.text, alpha)
+        requests[request.id] = request
+    failed: list[ToucanResult] = list()
+    for result in worker.synthesize(list(requests.values())):
+        if result.error:
+            failed.append(result)
             continue
-        mp3: str = get_mp3_chr(entry.voice, entry.text, alpha)
-        shutil.move(mp3 + ".tmp", mp3)
-    shutil.rmtree(tmp_dir, ignore_errors=True)
+        mp3_tmp: str = requests[result.id].mp3
+        shutil.move(mp3_tmp, mp3_tmp.removesuffix(".tmp"))
+        cache_index.add(os.path.relpath(mp3_tmp.removesuffix(".tmp")))
+        progress.update(1)
+    if failed:
+        for result in failed:
+            print(f"{requests[result.id].text}: {result.error}", file=sys.stderr)
+        raise Exception(f"IMS-Toucan worker failed {len(failed):,} of {len(requests):,} requests")
 
 
 def has_mp3_chr(voice, text_chr, alpha) -> bool:
-    mp3_chr: str = get_mp3_chr(voice, text_chr, alpha)
-    return os.path.exists(mp3_chr)
+    return cache_index.has(key_chr(voice, text_chr, alpha), get_mp3_chr(voice, text_chr, alpha))
 
 
 def tts_chr(voice: str | None, text_chr: str, alpha: float | None = None) -> None:
     mp3_chr: str = get_mp3_chr(voice, text_chr, alpha)
-    if os.path.exists(mp3_chr):
+    if dry_run or has_mp3_chr(voice, text_chr, alpha):
+        return
+    worker: ToucanWorker | None = toucan_worker()
+    if worker:
+        for result in worker.synthesize([toucan_request(0, voice, text_chr, alpha)]):
+            if result.error:
+                raise Exception(f"IMS-Toucan worker fail: {result.error}")
+        shutil.move(mp3_chr + ".tmp", mp3_chr)
+        cache_index.add(mp3_chr, key_chr(voice, text_chr, alpha))
         return
     cmd: list[str] = list()
     cmd.append(os.path.expanduser("~/git/IMS-Toucan/run_tts.py"))
@@ -98,6 +351,7 @@ def tts_chr(voice: str | None, text_chr: str, alpha: float | None = None) -> Non
         raise Exception("run_tts.py fail")
     else:
         shutil.move(mp3_chr + ".tmp", mp3_chr)
+        cache_index.add(mp3_chr, key_chr(voice, text_chr, alpha))
 
 
 def get_mp3_chr(voice: str | None, text_chr: str, alpha: float | None = None) -> str:
@@ -107,26 +361,80 @@ def get_mp3_chr(voice: str | None, text_chr: str, alpha: float | None = None) ->
     return mp3_chr
 
 
-def chr_audio(voice: str | None, text_chr: str, alpha: float | None = None) -> AudioSegment:
+def key_chr(voice: str | None, text_chr: str, alpha: float | None = None) -> ClipKey:
+    return ("chr", *clip_name(voice, text_chr, alpha)[:3])
+
+
+def get_pcm_chr(voice: str | None, text_chr: str, alpha: float | None = None) -> str:
+    return get_pcm_file(get_mp3_chr(voice, text_chr, alpha))
+
+
+def chr_clip(voice: str | None, text_chr: str, alpha: float | None = None) -> str:
+    """Returns the MP3 file for the text, synthesizing it if needed."""
     tts_chr(voice, text_chr, alpha)
-    mp3_file = get_mp3_chr(voice, text_chr, alpha)
-    return effects.normalize(AudioSegment.from_file(mp3_file))
+    return get_mp3_chr(voice, text_chr, alpha)
+
+
+def chr_audio(voice: str | None, text_chr: str, alpha: float | None = None) -> AudioSegment:
+    return load_audio(chr_clip(voice, text_chr, alpha))
 
 
 def tts_en(voice: str, text_en: str):
     mp3_en = get_mp3_en(voice, text_en)
-    if os.path.exists(mp3_en):
+    if dry_run or has_mp3_en(voice, text_en):
+        return
+    synthesize_en(voice, text_en, mp3_en)
+
+
+def tts_en_batch(entries: list[TTSBatchEntry]) -> None:
+    """Synthesizes the missing English audio for the entries, polly_threads requests at a time."""
+    if dry_run:
         return
-    polly_client: Polly = boto3.Session().client("polly")
-    response = polly_client.synthesize_speech(OutputFormat="mp3",  #
-                                              Text=text_en,  #
-                                              VoiceId=voice,  #
-                                              SampleRate=AMZ_HZ,  #
-                                              LanguageCode="en-US",  #
-                                              Engine="neural")
-    with open(mp3_en + ".tmp", "wb") as w:
+    pending: dict[str, TTSBatchEntry] = dict()
+    for entry in entries:
+        mp3_en: str = get_mp3_en(entry.voice, entry.text)
+        if mp3_en not in pending and not has_mp3_en(entry.voice, entry.text):
+            pending[mp3_en] = entry
+    if not pending:
+        return
+    print(f"Synthesizing {len(pending):,} English clips.")
+    with ThreadPoolExecutor(max_workers=max(1, polly_threads)) as executor:
+        futures = [executor.submit(synthesize_en, entry.voice, entry.text, mp3_en)
+                   for mp3_en, entry in pending.items()]
+        for future in futures:
+            future.result()
+
+
+def polly_client() -> Polly:
+    global _polly_client
+    with _polly_lock:
+        if _polly_client is None:
+            _polly_client = polly_provider()
+        return _polly_client
+
+
+def synthesize_en(voice: str, text_en: str, mp3_en: str) -> None:
+    for attempt in range(polly_retries + 1):
+        polly_limiter.wait()
+        try:
+            response = polly_client().synthesize_speech(OutputFormat="mp3",  #
+                                                        Text=text_en,  #
+                                                        VoiceId=voice,  #
+                                                        SampleRate=AMZ_HZ,  #
+                                                        LanguageCode="en-US",  #
+                                                        Engine="neural")
+            break
+        except (ClientError, BotoConnectionError) as e:
+            if isinstance(e, ClientError) and e.response.get("Error", {}).get("Code") not in POLLY_RETRY_CODES:
+                raise
+            if attempt == polly_retries:
+                raise
+            time.sleep(min(30.0, 0.5 * 2 ** attempt) * _polly_jitter.uniform(0.5, 1.0))
+    tmp_file: str = f"{mp3_en}.{threading.get_ident()}.tmp"
+    with open(tmp_file, "wb") as w:
         w.write(response["AudioStream"].read())
-    shutil.move(mp3_en + ".tmp", mp3_en)
+    shutil.move(tmp_file, mp3_en)
+    cache_index.add(mp3_en, key_en(voice, text_en))
 
 
 def get_mp3_en(voice: str | None, text_en: str) -> str:
@@ -136,13 +444,149 @@ def get_mp3_en(voice: str | None, text_en: str) -> str:
     return mp3_en
 
 
-def en_audio(voice: str | None, text_en: str) -> AudioSegment:
+def key_en(voice: str | None, text_en: str) -> ClipKey:
+    return ("en", *clip_name(voice, re.sub("\\s+", " ", text_en).strip())[:3])
+
+
+def has_mp3_en(voice: str | None, text_en: str) -> bool:
+    return cache_index.has(key_en(voice, text_en), get_mp3_en(voice, text_en))
+
+
+def get_pcm_en(voice: str | None, text_en: str) -> str:
+    return get_pcm_file(get_mp3_en(voice, text_en))
+
+
+def en_clip(voice: str | None, text_en: str) -> str:
+    """Returns the MP3 file for the text, synthesizing it if needed."""
     tts_en(voice, text_en)
-    mp3_file = get_mp3_en(voice, text_en)
-    return effects.normalize(AudioSegment.from_file(mp3_file))
+    return get_mp3_en(voice, text_en)
+
+
+def en_audio(voice: str | None, text_en: str) -> AudioSegment:
+    return load_audio(en_clip(voice, text_en))
+
+
+def load_audio(mp3_file: str) -> AudioSegment:
+    return clip_cache.load(mp3_file, lambda: load_pcm(mp3_file))
+
+
+def get_pcm_file(mp3_file: str) -> str:
+    """Sidecar location for an MP3's normalized PCM. cache/chr/x.mp3 => cache/chr-pcm/x.pcm"""
+    mp3_path: pathlib.Path = pathlib.Path(mp3_file)
+    return str(mp3_path.parent.with_name(mp3_path.parent.name + "-pcm").joinpath(mp3_path.stem + ".pcm"))
+
+
+def load_pcm(mp3_file: str) -> AudioSegment:
+    """Returns normalized LESSON_HZ mono audio for the MP3, only decoding it if the sidecar is missing or stale."""
+    pcm_file: str = get_pcm_file(mp3_file)
+    mp3_stat: os.stat_result = os.stat(mp3_file)
+    audio: AudioSegment | None = read_pcm(pcm_file, mp3_stat)
+    dbfs: float | None = None
+    if audio is None:
+        audio = AudioSegment.from_file(mp3_file)
+        dbfs = audio.dBFS
+        audio = effects.normalize(audio).set_channels(1).set_frame_rate(LESSON_HZ)
+        write_pcm(pcm_file, mp3_stat, audio)
+    cache_index.set_audio(mp3_file, int(audio.frame_count()), dbfs)
+    return audio
+
+
+def read_pcm_header(header: bytes, mp3_stat: os.stat_result) -> tuple[int, int, int] | None:
+    """Returns frame rate, channels, and sample width, or None if the sidecar does not match the MP3."""
+    if len(header) < PCM_HEADER.size:
+        return None
+    magic, size, mtime_ns, frame_rate, channels, sample_width = PCM_HEADER.unpack_from(header)
+    if magic != PCM_MAGIC or size != mp3_stat.st_size or mtime_ns != mp3_stat.st_mtime_ns:
+        return None
+    return frame_rate, channels, sample_width
+
+
+def read_pcm(pcm_file: str, mp3_stat: os.stat_result) -> AudioSegment | None:
+    if not os.path.exists(pcm_file):
+        return None
+    with open(pcm_file, "rb") as r:
+        params: tuple[int, int, int] | None = read_pcm_header(r.read(PCM_HEADER.size), mp3_stat)
+        if params is None:
+            return None
+        frame_rate, channels, sample_width = params
+        return AudioSegment(data=r.read(), sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+
+
+def write_pcm(pcm_file: str, mp3_stat: os.stat_result, audio: AudioSegment) -> None:
+    os.makedirs(os.path.dirname(pcm_file), exist_ok=True)
+    tmp_file: str = f"{pcm_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "wb") as w:
+        w.write(PCM_HEADER.pack(PCM_MAGIC, mp3_stat.st_size, mp3_stat.st_mtime_ns, audio.frame_rate,
+                                audio.channels, audio.sample_width))
+        w.write(audio.raw_data)
+    os.replace(tmp_file, pcm_file)
+
+
+def clip_frames(mp3_file: str) -> int:
+    """Length of the clip in LESSON_HZ frames. Uses the cache index or sidecar header before decoding."""
+    frames: int | None = probe_frames(mp3_file)
+    if frames is not None:
+        return frames
+    if dry_run:
+        raise RuntimeError(f"No duration is known for {mp3_file}. Do a full run to index it.")
+    return int(load_audio(mp3_file).frame_count())
+
+
+def probe_frames(mp3_file: str) -> int | None:
+    """Length of the clip in LESSON_HZ frames from the cache index or sidecar header, or None if not known."""
+    info: ClipInfo | None = cache_index.get(mp3_file)
+    if info and info.frames:
+        return info.frames
+    pcm_file: str = get_pcm_file(mp3_file)
+    if not os.path.exists(pcm_file) or not os.path.exists(mp3_file):
+        return None
+    with open(pcm_file, "rb") as r:
+        params: tuple[int, int, int] | None = read_pcm_header(r.read(PCM_HEADER.size), os.stat(mp3_file))
+    if not params or params[0] != LESSON_HZ:
+        return None
+    frames: int = (os.path.getsize(pcm_file) - PCM_HEADER.size) // (params[1] * params[2])
+    cache_index.set_audio(mp3_file, frames)
+    return frames
+
+
+def clip_durations(mp3_files: list[str]) -> dict[str, float]:
+    """
+    Durations in seconds of the clips, found in parallel. Clips not in the cache index or without a sidecar are
+    decoded once to make one, without being kept in the clip cache. In a dry run they are left out.
+    """
+    def duration(mp3_file: str) -> float | None:
+        frames: int | None = probe_frames(mp3_file)
+        if frames is None:
+            if dry_run or not os.path.exists(mp3_file):
+                return None
+            frames = int(load_pcm(mp3_file).frame_count())
+        return frames / LESSON_HZ
+
+    durations: dict[str, float] = dict()
+    with ThreadPoolExecutor() as executor:
+        for mp3_file, seconds in tqdm(zip(mp3_files, executor.map(duration, mp3_files)), total=len(mp3_files)):
+            if seconds is not None:
+                durations[mp3_file] = seconds
+    return durations
+
+
+def load_cache_index() -> None:
+    cache_index.load([CACHE_CHR, CACHE_EN])
+
+
+def save_cache_index() -> None:
+    cache_index.save()
 
 
 def get_filename(voice: str, text: str, alpha: float | None = None):
+    return clip_name(voice, text, alpha)[3]
+
+
+@functools.lru_cache(maxsize=None)
+def clip_name(voice: str | None, text: str, alpha: float | None = None) -> tuple[str, str, str, str]:
+    """Returns the voice, alpha, and normalized text SHA-1 keying the clip, and its cache file name."""
+    key_voice: str = voice if voice else "-"
+    key_alpha: str = f"{alpha:.2f}" if alpha and alpha != 1.0 else ""
     text = re.sub("\\s+", " ", textwrap.dedent(text)).strip()
     text = text.lower()
     if not voice:
@@ -159,4 +603,4 @@ def get_filename(voice: str, text: str, alpha: float | None = None):
     if len(_) > 32:
         _ = _[:32]
     filename: str = f"{_}_{voice}_{sha1}.mp3"
-    return filename
+    return key_voice, key_alpha, sha1, filename